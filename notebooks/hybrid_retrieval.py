@@ -0,0 +1,218 @@
+from collections import Counter
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from rank_bm25 import BM25Okapi
+from langchain_core.documents import Document
+
+
+def default_doc_key(doc: Document) -> Hashable:
+    """
+    Stable identity of a chunk across the dense and sparse retrievers.
+
+    Args:
+        doc: A LangChain document.
+
+    Returns:
+        metadata["id"] when present, otherwise (source, page, page_content).
+    """
+    if "id" in doc.metadata:
+        return doc.metadata["id"]
+    return (doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content)
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[Hashable]], rrf_k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse ranked lists of document keys with Reciprocal Rank Fusion.
+
+    Args:
+        ranked_lists: Each list holds document keys, best first.
+        rrf_k: Damping constant; larger values flatten the contribution of top ranks.
+
+    Returns:
+        (key, fused score) pairs sorted by fused score, best first.
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranked in ranked_lists:
+        for rank, key in enumerate(ranked):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_score_fusion(dense: Sequence[Tuple[Hashable, float]], sparse: Sequence[Tuple[Hashable, float]],
+                          alpha: float = 0.5) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse two candidate lists by min-max normalized scores (higher = better in both).
+
+    Args:
+        dense: (key, score) pairs from the vector retriever.
+        sparse: (key, score) pairs from the keyword retriever.
+        alpha: Weight of the dense score; 1 - alpha weights the sparse score.
+
+    Returns:
+        (key, fused score) pairs sorted by fused score, best first. A document missing
+        from one list gets 0 for that side.
+    """
+    def normalize(results):
+        if not results:
+            return {}
+        scores = np.array([score for _, score in results], dtype=float)
+        low, high = scores.min(), scores.max()
+        span = high - low if high > low else 1.0
+        return {key: (score - low) / span for key, score in results}
+
+    dense_norm = normalize(dense)
+    sparse_norm = normalize(sparse)
+    fused = {
+        key: alpha * dense_norm.get(key, 0.0) + (1 - alpha) * sparse_norm.get(key, 0.0)
+        for key in dense_norm.keys() | sparse_norm.keys()
+    }
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Retriever:
+    """
+    Exact BM25 top-n that skips documents which cannot reach the top n (MaxScore pruning).
+
+    Each query term's contribution is bounded by idf * (k1 + 1). Documents containing the
+    rarest query terms are scored first; their n-th best score is the threshold. A document
+    that only contains common terms (stopwords, high-df terms) whose bounds sum below the
+    threshold cannot make the top n, so those terms' postings are never expanded. When the
+    remaining candidates still exceed full_scan_ratio of the corpus, get_scores is used.
+    """
+
+    def __init__(self, documents: List[Document], bm25: Optional[BM25Okapi] = None,
+                 tokenizer: Callable[[str], List[str]] = str.split, full_scan_ratio: float = 0.5):
+        """
+        Args:
+            documents: The indexed documents, in the order BM25 was built with.
+            bm25: A prebuilt BM25Okapi over the same documents (built here if omitted).
+            tokenizer: Must match the tokenization used to build bm25.
+            full_scan_ratio: Candidate fraction of the corpus above which the whole corpus is scored.
+        """
+        self.documents = documents
+        self.tokenizer = tokenizer
+        self.full_scan_ratio = full_scan_ratio
+        tokenized = [tokenizer(doc.page_content) for doc in documents]
+        self.bm25 = bm25 or BM25Okapi(tokenized)
+        positions: Dict[str, List[int]] = {}
+        for i, tokens in enumerate(tokenized):
+            for token in set(tokens):
+                positions.setdefault(token, []).append(i)
+        self.postings: Dict[str, np.ndarray] = {token: np.array(ids, dtype=np.int64) for token, ids in positions.items()}
+
+    def search(self, query: str, n: int = 20) -> List[Tuple[Document, float]]:
+        """
+        Args:
+            query: The query string.
+            n: Number of results.
+
+        Returns:
+            Up to n (document, BM25 score) pairs, best first.
+        """
+        tokens = self.tokenizer(query)
+        counts = Counter(t for t in tokens if t in self.postings)
+        if not counts:
+            return []
+        # A term's BM25 contribution saturates below idf * (k1 + 1) however often it occurs
+        bound = {t: c * self.bm25.idf[t] * (self.bm25.k1 + 1) for t, c in counts.items()}
+        terms = sorted(counts, key=bound.get, reverse=True)
+
+        # Rarest terms first, until they yield n candidates; their n-th best score is the threshold
+        candidates = np.empty(0, dtype=np.int64)
+        taken = 0
+        while taken < len(terms) and len(candidates) < n:
+            candidates = np.union1d(candidates, self.postings[terms[taken]])
+            taken += 1
+        scores = np.asarray(self.bm25.get_batch_scores(tokens, candidates.tolist()))
+
+        rest = terms[taken:][::-1]
+        if rest:
+            threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+            # Terms whose cumulative bound stays below the threshold cannot lift a document into the top n alone
+            reach = np.cumsum([bound[t] for t in rest])
+            essential = rest[int(np.searchsorted(reach, threshold, side="left")):]
+            if essential:
+                extra = np.setdiff1d(np.unique(np.concatenate([self.postings[t] for t in essential])), candidates)
+                if len(candidates) + len(extra) > self.full_scan_ratio * len(self.documents):
+                    all_scores = np.asarray(self.bm25.get_scores(tokens))
+                    candidates = np.flatnonzero(all_scores > 0)
+                    scores = all_scores[candidates]
+                elif len(extra):
+                    candidates = np.concatenate([candidates, extra])
+                    scores = np.concatenate([scores, self.bm25.get_batch_scores(tokens, extra.tolist())])
+
+        n = min(n, len(candidates))
+        if n == 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.documents[candidates[i]], float(scores[i])) for i in top]
+
+
+class HybridRetriever:
+    """
+    Dense + keyword retrieval fused by document identity.
+
+    Each query pulls candidate_pool results from the vector store and from BM25, then fuses
+    them by document key with Reciprocal Rank Fusion ("rrf") or weighted normalized scores
+    ("weighted"). Cost per query depends on the pool size, not on the corpus size.
+    """
+
+    def __init__(self, vectorstore, bm25_retriever: BM25Retriever, candidate_pool: int = 20,
+                 method: str = "rrf", alpha: float = 0.5, rrf_k: int = 60,
+                 doc_key: Callable[[Document], Hashable] = default_doc_key,
+                 distance_scores: bool = True):
+        """
+        Args:
+            vectorstore: A LangChain vector store (e.g. FAISS) supporting similarity_search_with_score.
+            bm25_retriever: Keyword retriever over the same documents.
+            candidate_pool: Results taken from each retriever before fusion.
+            method: "rrf" or "weighted".
+            alpha: Dense weight for "weighted" fusion.
+            rrf_k: RRF damping constant.
+            doc_key: Maps a document to the identity used to merge the two lists.
+            distance_scores: True when the vector store returns distances (lower = better), as FAISS does.
+        """
+        if method not in ("rrf", "weighted"):
+            raise ValueError(f"Unknown fusion method: {method}")
+        self.vectorstore = vectorstore
+        self.bm25_retriever = bm25_retriever
+        self.candidate_pool = candidate_pool
+        self.method = method
+        self.alpha = alpha
+        self.rrf_k = rrf_k
+        self.doc_key = doc_key
+        self.distance_scores = distance_scores
+
+    def retrieve(self, query: str, k: int = 5) -> List[Document]:
+        """
+        Args:
+            query: The query string.
+            k: The number of documents to return.
+
+        Returns:
+            The top k fused documents, best first.
+        """
+        return [doc for doc, _ in self.retrieve_with_scores(query, k)]
+
+    def retrieve_with_scores(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        pool = max(k, self.candidate_pool)
+        docs: Dict[Hashable, Document] = {}
+
+        dense = []
+        for doc, score in self.vectorstore.similarity_search_with_score(query, k=pool):
+            key = self.doc_key(doc)
+            docs.setdefault(key, doc)
+            dense.append((key, -score if self.distance_scores else score))
+
+        sparse = []
+        for doc, score in self.bm25_retriever.search(query, n=pool):
+            key = self.doc_key(doc)
+            docs.setdefault(key, doc)
+            sparse.append((key, score))
+
+        if self.method == "rrf":
+            fused = reciprocal_rank_fusion([[key for key, _ in dense], [key for key, _ in sparse]], self.rrf_k)
+        else:
+            fused = weighted_score_fusion(dense, sparse, self.alpha)
+        return [(docs[key], score) for key, score in fused[:k]]
@@ -3,14 +3,26 @@ import pandas as pd
 from .base import BaseParser
 
 class HybridCSVParser(BaseParser):
+    def __init__(self, batch_size: int = 50000):
+        self.batch_size = batch_size
+
+    def iter_blocks(self, content: bytes):
+        # Read in row batches and build each batch's "col: value" texts column-wise
+        with pd.read_csv(io.BytesIO(content), chunksize=self.batch_size) as batches:
+            for df in batches:
+                text = None
+                for col in df.columns:
+                    # str() per value, as formatting the value itself did (NaN -> "nan")
+                    part = f"{col}: " + df[col].map(str)
+                    text = part if text is None else text + ", " + part
+                if text is None:
+                    continue
+                for idx, row_text in zip(df.index.tolist(), text.tolist()):
+                    if row_text.strip():
+                        yield {
+                            "text": row_text,
+                            "metadata": {"source": "pandas-csv", "row": idx}
+                        }
+
     def parse(self, content: bytes) -> list[dict]:
-        df = pd.read_csv(io.BytesIO(content))
-        blocks = []
-        for idx, row in df.iterrows():
-            text = ", ".join([f"{col}: {row[col]}" for col in df.columns])
-            if str(text).strip():
-                blocks.append({
-                    "text": text,
-                    "metadata": {"source": "pandas-csv", "row": idx}
-                })
-        return blocks
+        return list(self.iter_blocks(content))
@@ -17,18 +17,47 @@ class HybridExcelParser(BaseParser):
                 blocks.append({"text": text, "metadata": {"source": f"unstructured-{ext}", "block": idx}})
         return blocks
 
+    def _iter_with_openpyxl(self, content: bytes):
+        # Read-only mode streams rows instead of materializing every sheet as a DataFrame
+        from openpyxl import load_workbook
+        wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                rows = ws.iter_rows(values_only=True)
+                header = next(rows, None)
+                if not header:
+                    continue
+                columns = [col if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+                for idx, row in enumerate(rows):
+                    if all(value is None for value in row):
+                        continue
+                    text = ", ".join(
+                        f"{col}: {value if value is not None else 'nan'}" for col, value in zip(columns, row)
+                    )
+                    yield {
+                        "text": text,
+                        "metadata": {"source": "openpyxl-excel", "sheet": ws.title, "row": idx}
+                    }
+        finally:
+            wb.close()
+
     def _parse_with_pandas(self, content: bytes) -> list[dict]:
         blocks = []
         xl = pd.ExcelFile(io.BytesIO(content))
         for sheet in xl.sheet_names:
             df = xl.parse(sheet)
-            for idx, row in df.iterrows():
-                text = ", ".join([f"{col}: {row[col]}" for col in df.columns])
-                if str(text).strip():
-                    blocks.append({
-                        "text": text,
-                        "metadata": {"source": "pandas-excel", "sheet": sheet, "row": idx}
-                    })
+            text = None
+            for col in df.columns:
+                # str() per value, as the f-string formatting of each row did (NaN -> "nan")
+                part = f"{col}: " + df[col].map(str)
+                text = part if text is None else text + ", " + part
+            if text is None:
+                continue
+            for idx, row_text in zip(df.index.tolist(), text.tolist()):
+                blocks.append({
+                    "text": row_text,
+                    "metadata": {"source": "pandas-excel", "sheet": sheet, "row": idx}
+                })
         return blocks
 
     def parse(self, content: bytes, ext: str = "xlsx") -> list[dict]:
@@ -38,4 +67,6 @@ class HybridExcelParser(BaseParser):
                 return blocks
         except Exception:
             pass
+        if ext.lower() == "xlsx":
+            return list(self._iter_with_openpyxl(content))
         return self._parse_with_pandas(content)
@@ -3,14 +3,112 @@ from exceptions import KnowledgeManagementException
 from parsers.parser_factory import ParserFactory
 from preprocessing.cleaner import TextCleaner
 from chunking.smart_chunker import SmartChunker
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+import json
 import os
 
 
+# Per-process cleaner/chunker, built once by the pool initializer
+_worker_cleaner = None
+_worker_chunker = None
+
+
+def _init_worker():
+    global _worker_cleaner, _worker_chunker
+    _worker_cleaner = TextCleaner()
+    _worker_chunker = SmartChunker(max_tokens=500, overlap=50)
+
+
+def _process_file(file_path: str) -> dict:
+    """Parse, clean and chunk one file inside a pool worker."""
+    filename = os.path.basename(file_path)
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+
+        parser = ParserFactory.get_parser(filename, content)
+        blocks = parser.parse(content)
+        cleaned_blocks = _worker_cleaner.clean_blocks(blocks)
+        chunks = _worker_chunker.chunk(cleaned_blocks)
+
+        return {
+            "filename": filename,
+            "chunks": chunks,
+            "raw_blocks": len(blocks),
+            "cleaned_blocks": len(cleaned_blocks),
+            "error": None,
+        }
+    except Exception as e:
+        # Exceptions are returned as text so nothing unpicklable crosses the process boundary
+        return {"filename": filename, "chunks": [], "raw_blocks": 0, "cleaned_blocks": 0, "error": str(e)}
+
+
+class IngestionRunStatus:
+    """
+    Append-only per-file status log (JSON lines) used to resume interrupted runs.
+    A file is skipped on resume only if it finished with the same size and mtime.
+    """
+
+    def __init__(self, status_path: str):
+        self.status_path = status_path
+        self._entries = {}
+        if os.path.exists(status_path):
+            with open(status_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Tolerate a torn last line from a killed run
+                        continue
+                    self._entries[entry["file"]] = entry
+        self._fh = open(status_path, "a", encoding="utf-8")
+
+    def is_done(self, filename: str, size: int, mtime: float) -> bool:
+        entry = self._entries.get(filename)
+        return bool(entry) and entry["status"] == "done" and entry["size"] == size and entry["mtime"] == mtime
+
+    def record(self, filename: str, size: int, mtime: float, status: str, error: str = None):
+        entry = {"file": filename, "size": size, "mtime": mtime, "status": status, "error": error}
+        self._entries[filename] = entry
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
 class IngestionPipeline:
-    def __init__(self, input_dir="data/raw"):
+    def __init__(self, input_dir="data/raw", max_workers: int = None,
+                 max_inflight_bytes: int = 512 * 1024 * 1024, status_path: str = None):
+        """
+        :param max_workers: Process pool size for run_parallel (defaults to CPU count).
+        :param max_inflight_bytes: Cap on the total size of files submitted but not yet finished.
+        :param status_path: JSON-lines file recording per-file status so run_parallel can resume.
+        """
         self.input_dir = input_dir
         self.cleaner = TextCleaner()
         self.chunker = SmartChunker(max_tokens=500, overlap=50)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_inflight_bytes = max_inflight_bytes
+        self.status_path = status_path
+
+    def _list_files(self) -> list[tuple]:
+        if not os.path.exists(self.input_dir):
+            raise KnowledgeManagementException("Input directory not found", self.input_dir, "PipelineInit")
+
+        files = []
+        for filename in sorted(os.listdir(self.input_dir)):
+            file_path = os.path.join(self.input_dir, filename)
+            if not os.path.isfile(file_path):
+                continue
+            stat = os.stat(file_path)
+            files.append((filename, file_path, stat.st_size, stat.st_mtime))
+        return files
 
     def run(self):
         logger.info(f"Starting ingestion pipeline on {self.input_dir}")
@@ -50,3 +148,95 @@ class IngestionPipeline:
                 raise KnowledgeManagementException(str(e), filename, "Parsing")
 
         return results
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+
+    def _restart_pool(self, pool: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        # A broken pool rejects all further work; its in-flight files fail and the run continues
+        logger.warning("Worker pool broken (a worker process died); starting a new pool")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return self._new_pool()
+
+    def run_parallel(self, resume: bool = True):
+        """
+        Parse, clean and chunk every file in input_dir on a process pool.
+
+        Yields (filename, chunks) as each file finishes instead of collecting all results.
+        Failed files are logged and recorded in the status log rather than aborting the run;
+        with resume=True, files already marked done (same size and mtime) are skipped.
+        """
+        logger.info(f"Starting parallel ingestion on {self.input_dir} with {self.max_workers} workers")
+
+        files = self._list_files()
+        status = IngestionRunStatus(self.status_path) if self.status_path else None
+
+        pending = deque()
+        for filename, file_path, size, mtime in files:
+            if resume and status and status.is_done(filename, size, mtime):
+                continue
+            pending.append((filename, file_path, size, mtime))
+
+        skipped = len(files) - len(pending)
+        if skipped:
+            logger.info(f"Resuming run: {skipped} files already processed, {len(pending)} remaining")
+
+        inflight = {}  # future -> (filename, size, mtime)
+        inflight_bytes = 0
+        pool = self._new_pool()
+
+        try:
+            while pending or inflight:
+                # Keep the pool busy without exceeding the in-flight byte budget.
+                # A single oversized file is still admitted when nothing else is running.
+                while pending and len(inflight) < self.max_workers * 2:
+                    filename, file_path, size, mtime = pending[0]
+                    if inflight and inflight_bytes + size > self.max_inflight_bytes:
+                        break
+                    try:
+                        future = pool.submit(_process_file, file_path)
+                    except BrokenProcessPool:
+                        # A worker died since the last wait; this file was not submitted
+                        pool = self._restart_pool(pool)
+                        continue
+                    pending.popleft()
+                    inflight[future] = (filename, size, mtime)
+                    inflight_bytes += size
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    filename, size, mtime = inflight.pop(future)
+                    inflight_bytes -= size
+
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # Worker process died (e.g. OOM-killed) rather than raising
+                        broken = True
+                        result = {"filename": filename, "chunks": [], "error": f"worker process died: {e}"}
+                    except Exception as e:
+                        result = {"filename": filename, "chunks": [], "error": str(e)}
+
+                    if result["error"]:
+                        logger.error(f"Unhandled error in {filename}: {result['error']}")
+                        if status:
+                            status.record(filename, size, mtime, "failed", result["error"])
+                        continue
+
+                    chunks = result["chunks"]
+                    logger.info(
+                        f"Processed {filename}: {result['raw_blocks']} raw → "
+                        f"{result['cleaned_blocks']} cleaned → {len(chunks)} chunks"
+                    )
+                    yield filename, chunks
+                    # Only after the consumer handled the chunks, so a failure there is retried on resume
+                    if status:
+                        status.record(filename, size, mtime, "done")
+
+                if broken:
+                    pool = self._restart_pool(pool)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if status:
+                status.close()
@@ -7,13 +7,26 @@ try:
 except ImportError:
     pytesseract = None
 
+try:
+    from ingestion.parsers.ocr_cache import get_ocr_cache
+except ImportError:
+    get_ocr_cache = None
+
+# OCRCache strategy key: pytesseract text is cached apart from unstructured's OCR elements
+PYTESSERACT_OCR_STRATEGY = "pytesseract"
+
+
+def _tesseract_pairs(img_bytes: bytes) -> List[List[str]]:
+    text = pytesseract.image_to_string(Image.open(io.BytesIO(img_bytes)))
+    return [["Text", text]] if text.strip() else []
+
 
 def ocr_image_bytes(img_bytes: bytes, source: str, meta: dict) -> List[Dict]:
-    """Run OCR on image bytes and return text blocks with metadata"""
+    """Run OCR on image bytes (through the shared OCRCache when available) and return text blocks with metadata"""
     if not pytesseract:
         return []
-    image = Image.open(io.BytesIO(img_bytes))
-    text = pytesseract.image_to_string(image)
-    if text.strip():
-        return [{"text": text, "metadata": {**meta, "source": source, "type": "image-ocr"}}]
-    return []
+    if get_ocr_cache is not None:
+        pairs = get_ocr_cache().get_or_compute(img_bytes, PYTESSERACT_OCR_STRATEGY, _tesseract_pairs)
+    else:
+        pairs = _tesseract_pairs(img_bytes)
+    return [{"text": text, "metadata": {**meta, "source": source, "type": "image-ocr"}} for _, text in pairs]
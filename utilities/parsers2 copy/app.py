@@ -1,5 +1,6 @@
-from fastapi import FastAPI, Request, BackgroundTasks
-from ingestion.sharepoint_webhook import SharePointWebhookProcessor
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from ingestion.job_queue import Job, JobQueue, WorkerPool
 from ingestion.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,7 +14,10 @@ TENANT_ID = "YOUR_TENANT_ID"
 SITE_ID = "YOUR_SITE_ID"
 DRIVE_ID = "YOUR_DRIVE_ID"
 
-processor = SharePointWebhookProcessor(CLIENT_ID, CLIENT_SECRET, TENANT_ID)
+# The webhook only enqueues; events are processed by worker processes (python app.py).
+# Events are coalesced per item id and debounced, so a save burst or bulk upload
+# becomes one job per item (last event wins, a trailing delete is final).
+queue = JobQueue(debounce=5.0)
 
 @app.get("/sharepoint/webhook")
 async def validation(request: Request):
@@ -24,12 +28,33 @@ async def validation(request: Request):
     return {"status": "ok"}
 
 @app.post("/sharepoint/webhook")
-async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
+async def handle_webhook(request: Request):
     data = await request.json()
     events = data.get("value", [])
-    logger.info(f"Webhook events received: {len(events)}")
+    jobs = [
+        ("sharepoint_event", {"event": event, "site_id": SITE_ID, "drive_id": DRIVE_ID},
+         event.get("resourceData", {}).get("id"))
+        for event in events
+    ]
+    # sqlite commit: keep it off the event loop
+    queued = await run_in_threadpool(queue.enqueue_many, jobs)
+    logger.info(f"Webhook events received: {len(events)}, queued as {queued} jobs")
 
-    for event in events:
-        background_tasks.add_task(processor.process_event, event, SITE_ID, DRIVE_ID)
+    return {"status": "accepted"}
 
-    return {"status": "processing"}
+
+def run_workers(workers: int = 4):
+    """Ingestion worker process: claims queued webhook events until interrupted."""
+    from ingestion.sharepoint_webhook import SharePointWebhookProcessor
+
+    processor = SharePointWebhookProcessor(CLIENT_ID, CLIENT_SECRET, TENANT_ID)
+
+    def handle_event(job: Job):
+        processor.process_event(job.payload["event"], job.payload["site_id"], job.payload["drive_id"],
+                                is_current=lambda: queue.is_current(job.id))
+
+    WorkerPool(queue, {"sharepoint_event": handle_event}, workers=workers).run_forever()
+
+
+if __name__ == "__main__":
+    run_workers()
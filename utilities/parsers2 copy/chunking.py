@@ -1,41 +1,159 @@
-from typing import List, Dict
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, List, Dict, Iterable, Iterator, Optional, Tuple
+import hashlib
 import re
+from ingestion.utils.hashing import chunk_text_hash
 
 
-_sentence_splitter_re = re.compile(r'(?<=[.!?])\s+')
+_word_re = re.compile(r'\S+')
 
+_MASK64 = (1 << 64) - 1
 
 
+def word_spans(text: str) -> Tuple[array, array]:
+    """Tokenize once: parallel arrays of each word's [start, end) character offsets."""
+    starts, ends = array("q"), array("q")
+    for m in _word_re.finditer(text):
+        starts.append(m.start())
+        ends.append(m.end())
+    return starts, ends
 
-class StableChunker:
-    def __init__(self, words_per_chunk: int = 150, overlap_words: int = 30):
-        assert words_per_chunk > overlap_words, "words_per_chunk must be greater than overlap"
-        self.words_per_chunk = words_per_chunk
-        self.overlap_words = overlap_words
 
+class ChunkView(MutableMapping):
+    """
+    A chunk as a [start, end) character span of its block's text.
+    Behaves like the {"text", "metadata"} dict chunkers used to return, but the text is only
+    sliced out of the source when read, and metadata carries char_start/char_end.
+    Not a dict: use to_dict() before JSON output. Pickling (e.g. to worker processes) sends
+    only the chunk's own text and arrives as that plain dict, never the whole block source.
+    """
 
-    def _split_sentences(self, text: str) -> List[str]:
-        # naive sentence split; works well enough for many docs
-        sentences = [s.strip() for s in _sentence_splitter_re.split(text) if s.strip()]
-        return sentences
+    __slots__ = ("source", "start", "end", "block_metadata", "_extra")
 
+    def __init__(self, source: str, start: int, end: int, block_metadata: Dict[str, Any]):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.block_metadata = block_metadata
+        self._extra: Dict[str, Any] = {}
 
-    def _sentences_to_words(self, sentences: List[str]) -> List[str]:
-        # produce a word list preserving order
-        words = []
-        for s in sentences:
-            # split on whitespace
-            ws = [w for w in s.split() if w]
-            words.extend(ws)
-        return words
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
 
+    def __getitem__(self, key):
+        if key in self._extra:
+            return self._extra[key]
+        if key == "text":
+            return self.text
+        if key == "metadata":
+            # Cached so callers that mutate the metadata keep their changes
+            meta = {**self.block_metadata, "char_start": self.start, "char_end": self.end}
+            self._extra["metadata"] = meta
+            return meta
+        raise KeyError(key)
 
-    def chunk(self, blocks: List[Dict]) -> List[Dict]:
+    def __setitem__(self, key, value):
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        del self._extra[key]
+
+    def __iter__(self):
+        yield "text"
+        yield "metadata"
+        yield from (k for k in self._extra if k not in ("text", "metadata"))
+
+    def __len__(self) -> int:
+        return 2 + sum(1 for k in self._extra if k not in ("text", "metadata"))
+
+    def __repr__(self) -> str:
+        return f"ChunkView({self.start}:{self.end}, {self.text[:40]!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain {text, metadata, ...} dict with the text sliced out."""
+        return dict(self)
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+
+
+class StableChunker:
+    """
+    Word-window chunker over character offsets: each block is tokenized once into word spans
+    and chunks are ChunkViews (spans of the block text), so overlapping windows copy nothing.
+    mode="fixed": windows of words_per_chunk words every (words_per_chunk - overlap_words) words.
+    mode="cdc": content-defined boundaries. A gear rolling hash runs over the words and a chunk ends
+    where the hash matches a mask (sized so chunks average ~words_per_chunk), bounded by
+    min_words/max_words; max_words counts the overlap_words carried over from the previous chunk.
+    A boundary depends only on the preceding 64 words, so an edit only changes the chunks around
+    it and the rest keep their hashes (and embeddings).
+    """
+
+    MODES = ("fixed", "cdc")
+
+    def __init__(self, words_per_chunk: int = 150, overlap_words: int = 30, mode: str = "fixed",
+                 min_words: Optional[int] = None, max_words: Optional[int] = None):
+        assert words_per_chunk > overlap_words, "words_per_chunk must be greater than overlap"
+        assert mode in self.MODES, f"mode must be one of {self.MODES}"
+        self.words_per_chunk = words_per_chunk
+        self.overlap_words = overlap_words
+        self.mode = mode
+        self.min_words = min_words or max(1, words_per_chunk // 2)
+        self.max_words = max_words or words_per_chunk * 2
+        assert self.min_words < self.max_words, "min_words must be less than max_words"
+        assert self.max_words > overlap_words, "max_words must be greater than overlap"
+        # Past min_words a cut happens with probability 1/2^bits per word
+        bits = max(1, (words_per_chunk - self.min_words).bit_length() - 1)
+        self._cut_mask = ((1 << bits) - 1) << (64 - bits)
+        self._gear: Dict[str, int] = {}
+
+
+    def _word_value(self, word: str) -> int:
+        # Stable across processes (unlike hash()), memoized per chunker
+        value = self._gear.get(word)
+        if value is None:
+            value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            if len(self._gear) < 200000:
+                self._gear[word] = value
+        return value
+
+    def _cdc_bounds(self, text: str, starts: array, ends: array) -> Iterator[tuple]:
+        """Yield (start, end) word ranges with content-defined ends."""
+        start, h = 0, 0
+        n = len(starts)
+        for i in range(n):
+            h = ((h << 1) + self._word_value(text[starts[i]:ends[i]])) & _MASK64
+            size = i + 1 - start
+            # _windows prepends up to overlap_words, which count against max_words
+            if size >= self.max_words - min(start, self.overlap_words) or (size >= self.min_words and not (h & self._cut_mask)):
+                yield start, i + 1
+                start = i + 1
+        if start < n:
+            yield start, n
+
+    def _windows(self, text: str, starts: array, ends: array) -> Iterator[tuple]:
+        if self.mode == "cdc":
+            for start, end in self._cdc_bounds(text, starts, ends):
+                # Overlap carries the tail of the previous chunk, so it is content-defined as well
+                yield max(0, start - self.overlap_words), end
+            return
+
+        i = 0
+        n = len(starts)
+        step = self.words_per_chunk - self.overlap_words
+        if step <= 0:
+            step = self.words_per_chunk
+        while i < n:
+            yield i, min(i + self.words_per_chunk, n)
+            i += step
+
+    def iter_chunks(self, blocks: Iterable[Dict]) -> Iterator[Dict]:
         """
-        Accepts list of blocks: {text, metadata}
-        Returns list of chunks: {text, metadata}
+        Generator form of chunk(): consumes blocks lazily and yields chunks as they are cut.
         """
-        chunks = []
         for block in blocks:
             text = block.get("text", "")
             meta = block.get("metadata", {})
@@ -43,23 +161,28 @@ class StableChunker:
                 continue
 
 
-            sentences = self._split_sentences(text)
-            words = self._sentences_to_words(sentences)
-
+            starts, ends = word_spans(text)
+            for first, last in self._windows(text, starts, ends):
+                yield ChunkView(text, starts[first], ends[last - 1], meta)
 
-            i = 0
-            n = len(words)
-            step = self.words_per_chunk - self.overlap_words
-            if step <= 0:
-                step = self.words_per_chunk
 
-
-            while i < n:
-                chunk_words = words[i: i + self.words_per_chunk]
-                if not chunk_words:
-                    break
-                chunk_text = " ".join(chunk_words).strip()
-                chunks.append({"text": chunk_text, "metadata": meta})
-                i += step
-
-        return chunks
\ No newline at end of file
+    def chunk(self, blocks: List[Dict]) -> List[Dict]:
+        """
+        Accepts list of blocks: {text, metadata}
+        Returns list of chunks: ChunkView mappings with {text, metadata}
+        (call to_dict() on each before JSON serialization)
+        """
+        return list(self.iter_chunks(blocks))
+
+
+def reembed_fraction(old_chunks: Iterable[Dict], new_chunks: Iterable[Dict]) -> float:
+    """
+    Share of the new revision's chunks whose hash is not in the old revision, i.e. the
+    fraction the hash-diffing pipeline would re-embed. Compare chunker settings with
+    reembed_fraction(chunker.chunk(old_blocks), chunker.chunk(new_blocks)).
+    """
+    old_hashes = {chunk_text_hash(c["text"]) for c in old_chunks}
+    new_hashes = [chunk_text_hash(c["text"]) for c in new_chunks]
+    if not new_hashes:
+        return 0.0
+    return sum(1 for h in new_hashes if h not in old_hashes) / len(new_hashes)
@@ -0,0 +1,275 @@
+# ingestion/embedding/embedding_cache.py
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from ingestion.utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store keyed by (chunk hash, model id, dimension).
+    - One namespace directory per (model id, dimension)
+    - Vectors stored as float16 rows in a memory-mapped file (vectors.f16)
+    - Hash -> row index kept as an append-only log (index.log), rewritten on compaction
+    - In-process LRU of the same float16 rows in front of the memmap
+    - Once the store exceeds max_bytes, least-recently-used rows are compacted away
+    Safe to share between worker processes: writes and compaction hold an exclusive lock (flock,
+    or msvcrt on Windows) on the namespace's lock file, and each process picks up the others'
+    rows from index.log.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, dim: int,
+                 max_bytes: int = 1024 * 1024 * 1024, max_memory_items: int = 10000):
+        self.model_id = model_id
+        self.dim = dim
+        self.max_rows = max(1, max_bytes // (dim * 2))
+        self.max_memory_items = max_memory_items
+
+        safe_model = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id)
+        self.path = os.path.join(cache_dir, f"{safe_model}-{dim}")
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f16")
+        self._index_path = os.path.join(self.path, "index.log")
+        self._lock_path = os.path.join(self.path, "lock")
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._rows: Dict[str, int] = {}
+        self._last_used: Dict[str, int] = {}
+        self._tick = 0
+        self._count = 0
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._index_id = None  # (inode, bytes read) of index.log as last synced
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        with self._file_lock(exclusive=False):
+            self._sync()
+        logger.info(f"[EmbeddingCache] {self.path}: {len(self._rows)} cached vectors")
+
+    # --------------------------
+    # Storage
+    # --------------------------
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """
+        Cross-process lock on the namespace: shared to read the files, exclusive to change them.
+        On Windows (no fcntl) msvcrt byte-range locks are used, which are always exclusive.
+        """
+        with open(self._lock_path, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10s; keep waiting like flock does
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _map(self):
+        """(Re)map vectors.f16 at its current size."""
+        self._vectors = None
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        self._capacity = size // (self.dim * 2)
+        if self._capacity:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+",
+                                      shape=(self._capacity, self.dim))
+
+    def _sync(self):
+        """Pick up rows other processes appended to index.log, or reload after their compaction."""
+        try:
+            st = os.stat(self._index_path)
+        except FileNotFoundError:
+            st = None
+        inode = st.st_ino if st else None
+        if self._index_id is not None and self._index_id == (inode, st.st_size if st else 0):
+            return
+        offset = self._index_id[1] if self._index_id and self._index_id[0] == inode else 0
+        if offset == 0:
+            # First load, or index.log was rewritten by a compaction: row numbers changed
+            self._rows = {}
+            self._count = 0
+        if st is not None:
+            with open(self._index_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # torn last line from a killed writer; re-read it on the next sync
+                        break
+                    offset += len(line)
+                    try:
+                        chunk_hash, row = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._rows[chunk_hash] = row
+                    self._count = max(self._count, row + 1)
+        self._index_id = (inode, offset)
+
+        self._map()
+        # Rows logged but never fully written are dropped
+        if self._count > self._capacity:
+            self._rows = {h: r for h, r in self._rows.items() if r < self._capacity}
+            self._count = self._capacity
+        self._last_used = {h: self._last_used.get(h, 0) for h in self._rows}
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity:
+            return
+        # Grow geometrically, but never preallocate past the size budget
+        new_capacity = max(needed, min(max(self._capacity * 2, 1024), self.max_rows))
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 2)
+        self._map()
+
+    def _compact(self, incoming: int):
+        """Keep only the most recently used rows, leaving room for `incoming` new ones."""
+        keep = max(0, int(self.max_rows * 0.8) - incoming)
+        survivors = sorted(self._rows, key=lambda h: self._last_used.get(h, 0), reverse=True)[:keep]
+        old_rows = np.array([self._rows[h] for h in survivors], dtype=np.int64)
+        data = np.asarray(self._vectors[old_rows]) if len(old_rows) else np.empty((0, self.dim), np.float16)
+
+        tmp_vectors = self._vectors_path + ".tmp"
+        tmp_index = self._index_path + ".tmp"
+        data.tofile(tmp_vectors)
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            for row, chunk_hash in enumerate(survivors):
+                f.write(json.dumps([chunk_hash, row]) + "\n")
+
+        self._vectors = None
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_index, self._index_path)
+
+        evicted = len(self._rows) - len(survivors)
+        self._rows = {h: row for row, h in enumerate(survivors)}
+        self._last_used = {h: self._last_used.get(h, 0) for h in survivors}
+        self._count = len(survivors)
+        st = os.stat(self._index_path)
+        self._index_id = (st.st_ino, st.st_size)
+        self._map()
+        logger.info(f"[EmbeddingCache] compacted {self.path}: evicted {evicted}, kept {len(survivors)}")
+
+    def _remember(self, chunk_hash: str, vector: np.ndarray):
+        self._memory[chunk_hash] = vector
+        self._memory.move_to_end(chunk_hash)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def get_many(self, chunk_hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Return {chunk_hash: float16 vector} for every hash present in the cache."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock, self._file_lock(exclusive=False):
+            self._sync()
+            for chunk_hash in chunk_hashes:
+                self._tick += 1
+                vector = self._memory.get(chunk_hash)
+                if vector is not None:
+                    self._memory.move_to_end(chunk_hash)
+                    self.memory_hits += 1
+                else:
+                    row = self._rows.get(chunk_hash)
+                    if row is None:
+                        self.misses += 1
+                        continue
+                    vector = np.array(self._vectors[row])
+                    self._remember(chunk_hash, vector)
+                    self.disk_hits += 1
+                self._last_used[chunk_hash] = self._tick
+                found[chunk_hash] = vector
+        return found
+
+    def put_many(self, chunk_hashes: Sequence[str], vectors: Sequence[Sequence[float]]):
+        arr = np.asarray(vectors, dtype=np.float16)
+        if arr.ndim != 2 or arr.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got shape {arr.shape}")
+
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            new = [(h, v) for h, v in zip(chunk_hashes, arr) if h not in self._rows]
+            if not new:
+                return
+            if self._count + len(new) > self.max_rows:
+                self._compact(len(new))
+            self._ensure_capacity(self._count + len(new))
+
+            start = self._count
+            self._vectors[start:start + len(new)] = np.stack([v for _, v in new])
+            self._vectors.flush()
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                for offset, (chunk_hash, vector) in enumerate(new):
+                    self._tick += 1
+                    self._rows[chunk_hash] = start + offset
+                    self._last_used[chunk_hash] = self._tick
+                    self._remember(chunk_hash, vector)
+                    f.write(json.dumps([chunk_hash, start + offset]) + "\n")
+            self._count += len(new)
+            st = os.stat(self._index_path)
+            self._index_id = (st.st_ino, st.st_size)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stored_vectors": len(self._rows),
+                "disk_bytes": self._capacity * self.dim * 2,
+            }
+
+
+def embed_with_cache(embedder, cache: Optional[EmbeddingCache], chunk_hashes: List[str],
+                     texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts aligned with chunk_hashes, sending only cache misses to the model.
+    Output order matches the input order.
+    """
+    if cache is None:
+        return embedder.embed_batch(texts)
+
+    cached = cache.get_many(chunk_hashes)
+    miss_positions = [i for i, h in enumerate(chunk_hashes) if h not in cached]
+    if miss_positions:
+        # Identical texts inside one batch are embedded once
+        unique: Dict[str, int] = {}
+        for i in miss_positions:
+            unique.setdefault(chunk_hashes[i], i)
+        fresh = embedder.embed_batch([texts[i] for i in unique.values()])
+        cache.put_many(list(unique.keys()), fresh)
+        # Same float16 precision as a later cache hit, so repeated texts always get identical vectors
+        cached.update(zip(unique.keys(), (np.asarray(v, dtype=np.float16) for v in fresh)))
+
+    logger.info(f"[EmbeddingCache] {len(chunk_hashes) - len(miss_positions)} hits, {len(miss_positions)} misses")
+    return [cached[h].tolist() for h in chunk_hashes]
@@ -0,0 +1,115 @@
+# ingestion/embedding/embedding_service.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, List, Optional, Tuple
+from ingestion.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _EmbedRequest:
+    __slots__ = ("texts", "results", "remaining", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.results: List[Any] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.future: Future = Future()
+
+
+class EmbeddingService:
+    """
+    Cross-document micro-batching front for an Embedder:
+    - Concurrent ingestions call embed_batch(); their texts are pooled into shared batches
+    - A batch is flushed at max_batch_size texts or once the oldest text has waited max_wait_ms
+    - Each batch is sorted by token length to limit padding before it is sent to the model
+    - Results are routed back to each caller in its original order
+    Drop-in for Embedder wherever only embed_batch() is used.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 64, max_wait_ms: float = 20.0,
+                 length_fn: Optional[Callable[[str], int]] = None):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.length_fn = length_fn or (lambda text: len(text.split()))
+
+        # (request, position in request, enqueue time)
+        self._pending: Deque[Tuple[_EmbedRequest, int, float]] = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._thread.start()
+
+        self.batches = 0
+        self.embedded = 0
+
+    def embed_batch(self, texts: List[str]) -> List[Any]:
+        if not texts:
+            return []
+        request = _EmbedRequest(list(texts))
+        now = time.monotonic()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("EmbeddingService is stopped")
+            self._pending.extend((request, pos, now) for pos in range(len(texts)))
+            self._cond.notify()
+        return request.future.result()
+
+    def _next_batch(self) -> List[Tuple[_EmbedRequest, int, float]]:
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            # Wait for a full batch, but never past the oldest item's deadline
+            while not self._stopped and len(self._pending) < self.max_batch_size:
+                remaining = self._pending[0][2] + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+            size = min(self.max_batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopped:
+                    return
+                continue
+
+            try:
+                # Sort by token length so similar-length texts share padding
+                batch.sort(key=lambda item: self.length_fn(item[0].texts[item[1]]))
+                vectors = self.embedder.embed_batch([req.texts[pos] for req, pos, _ in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(f"Embedder returned {len(vectors)} vectors for {len(batch)} texts")
+
+                self.batches += 1
+                self.embedded += len(batch)
+                for (req, pos, _), vector in zip(batch, vectors):
+                    req.results[pos] = vector
+                    req.remaining -= 1
+                    if req.remaining == 0:
+                        req.future.set_result(req.results)
+            except Exception as e:
+                # Every caller in the batch gets the error; none is left waiting on its future
+                logger.exception(f"[EmbeddingService] batch of {len(batch)} failed: {e}")
+                self._fail(batch, e)
+
+    def _fail(self, batch, error: Exception):
+        failed = {id(req): req for req, _, _ in batch}
+        with self._cond:
+            # Drop the rest of every failed request so it is not embedded for nothing
+            self._pending = deque(item for item in self._pending if id(item[0]) not in failed)
+        for req in failed.values():
+            if not req.future.done():
+                req.future.set_exception(error)
+
+    def stop(self):
+        """Finish pending work and stop the batching thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,375 @@
+# ingestion/job_queue.py
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from ingestion.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    available_at  REAL NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    coalesce_key  TEXT,
+    superseded    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+"""
+
+# Added after the first release; older databases get them on open
+_COLUMNS = {
+    "coalesce_key": "TEXT",
+    "superseded": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    coalesce_key: Optional[str] = None
+
+
+class JobQueue:
+    """
+    Durable local job queue on SQLite (WAL mode), shared by the API and any number of worker processes:
+    - enqueue/enqueue_many only insert rows, so producers return in milliseconds
+    - claim() leases ready jobs to one worker for visibility_timeout seconds in a single UPDATE;
+      a lease that is not completed, failed or extended (heartbeat) in time expires and the job
+      becomes claimable again
+    - fail() retries with exponential backoff; after max_attempts the job is dead-lettered
+      (status 'dead') and stays in the table for inspection and retry_dead()
+    - Jobs enqueued with a coalesce_key (e.g. a SharePoint item id) are debounced: while a job for
+      the key is still queued, a new one replaces its kind/payload (last event wins, so a trailing
+      delete is final) and pushes it back by `debounce` seconds, at most `max_debounce` after the
+      first event. Running jobs for the key are flagged superseded (see is_current()), and at most
+      one job per key is leased at a time
+    """
+
+    def __init__(self, db_path: Optional[str] = None, visibility_timeout: float = 300.0,
+                 max_attempts: int = 5, retry_backoff: float = 10.0,
+                 debounce: float = 0.0, max_debounce: float = 60.0):
+        self.db_path = db_path or os.environ.get("JOB_QUEUE_DB_PATH", "jobs.db")
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.debounce = debounce
+        self.max_debounce = max_debounce
+        self._lock = threading.Lock()
+        # timeout: wait on other processes' write locks instead of failing with "database is locked"
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        with self._conn:
+            for column, decl in _COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_coalesce ON jobs (coalesce_key, status)")
+
+    # --------------------------
+    # Producers
+    # --------------------------
+    def _insert(self, kind: str, payload: Dict[str, Any], delay: float, coalesce_key: Optional[str],
+                now: float) -> int:
+        if coalesce_key is not None:
+            # In-flight work for this key is now stale
+            self._conn.execute(
+                "UPDATE jobs SET superseded = 1, updated_at = ? "
+                "WHERE coalesce_key = ? AND status = 'leased' AND superseded = 0",
+                (now, coalesce_key),
+            )
+            pending = self._conn.execute(
+                "SELECT id, created_at FROM jobs WHERE coalesce_key = ? AND status = 'queued' "
+                "ORDER BY id DESC LIMIT 1",
+                (coalesce_key,),
+            ).fetchone()
+            if pending is not None:
+                job_id, created_at = pending
+                available_at = min(now + max(delay, self.debounce), created_at + self.max_debounce)
+                # The merged job is new work: a retry waiting out an earlier failure starts over,
+                # with a fresh attempt budget and the debounce window instead of its backoff
+                self._conn.execute(
+                    "UPDATE jobs SET kind = ?, payload = ?, "
+                    "available_at = CASE WHEN attempts > 0 THEN ? ELSE MAX(available_at, ?) END, "
+                    "attempts = 0, last_error = NULL, updated_at = ? WHERE id = ?",
+                    (kind, json.dumps(payload), available_at, available_at, now, job_id),
+                )
+                return job_id
+            delay = max(delay, self.debounce)
+
+        cur = self._conn.execute(
+            "INSERT INTO jobs (kind, payload, max_attempts, available_at, created_at, updated_at, coalesce_key) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), self.max_attempts, now + delay, now, now, coalesce_key),
+        )
+        return cur.lastrowid
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0,
+                coalesce_key: Optional[str] = None) -> int:
+        """Queue a job (or merge it into the pending job for coalesce_key); returns the job id."""
+        with self._lock, self._conn:
+            return self._insert(kind, payload, delay, coalesce_key, time.time())
+
+    def enqueue_many(self, jobs: Iterable[Tuple], delay: float = 0.0) -> int:
+        """
+        Queue (kind, payload) or (kind, payload, coalesce_key) tuples in one transaction.
+        Returns the number of distinct jobs they ended up in.
+        """
+        with self._lock, self._conn:
+            now = time.time()
+            job_ids = {
+                self._insert(job[0], job[1], delay, job[2] if len(job) > 2 else None, now)
+                for job in jobs
+            }
+            return len(job_ids)
+
+    # --------------------------
+    # Workers
+    # --------------------------
+    def claim(self, worker_id: str, limit: int = 1) -> List[Job]:
+        """
+        Lease up to `limit` ready jobs (queued and due, or with an expired lease) to worker_id.
+        A job whose coalesce_key has another live lease waits for it to finish.
+        """
+        with self._lock, self._conn:
+            now = time.time()
+            # Expired leases on their last attempt are dead, not retried
+            self._conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, updated_at = ?, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires <= ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            rows = self._conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? "
+                "WHERE id IN ("
+                "  SELECT id FROM jobs AS j WHERE ((status = 'queued' AND available_at <= ?) "
+                "  OR (status = 'leased' AND lease_expires <= ?)) "
+                "  AND (coalesce_key IS NULL OR NOT EXISTS ("
+                "    SELECT 1 FROM jobs AS other WHERE other.coalesce_key = j.coalesce_key "
+                "    AND other.id != j.id AND other.status = 'leased' AND other.lease_expires > ?)) "
+                "  ORDER BY available_at, id LIMIT ?"
+                ") RETURNING id, kind, payload, attempts, coalesce_key",
+                (worker_id, now + self.visibility_timeout, now, now, now, now, limit),
+            ).fetchall()
+        return sorted((Job(job_id, kind, json.loads(payload), attempts, key)
+                       for job_id, kind, payload, attempts, key in rows),
+                      key=lambda job: job.id)
+
+    def is_current(self, job_id: int) -> bool:
+        """False once a newer event for the job's coalesce_key arrived (or the job is no longer leased)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND status = 'leased' AND superseded = 0", (job_id,)
+            ).fetchone()
+        return row is not None
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease; False when the worker no longer owns the job."""
+        with self._lock, self._conn:
+            now = time.time()
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.visibility_timeout, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time(), job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+        Schedule a retry with exponential backoff, or dead-letter the job after max_attempts.
+        Superseded jobs are not retried; the newer job for their key covers them.
+        """
+        with self._lock, self._conn:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts, superseded FROM jobs "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts, superseded = row
+            if superseded:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+            elif attempts >= max_attempts:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', lease_owner = NULL, lease_expires = NULL, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+                logger.error(f"[JobQueue] job {job_id} dead after {attempts} attempts: {error}")
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL, "
+                    "available_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (now + self.retry_backoff * 2 ** (attempts - 1), error, now, job_id),
+                )
+            return True
+
+    # --------------------------
+    # Operations
+    # --------------------------
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def dead_jobs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, attempts, last_error, updated_at FROM jobs "
+                "WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"id": job_id, "kind": kind, "payload": json.loads(payload), "attempts": attempts,
+             "last_error": last_error, "updated_at": updated_at}
+            for job_id, kind, payload, attempts, last_error, updated_at in rows
+        ]
+
+    def retry_dead(self, job_id: int) -> bool:
+        """Put a dead-lettered job back in the queue with a fresh attempt budget."""
+        with self._lock, self._conn:
+            now = time.time()
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (now, now, job_id),
+            )
+            return cur.rowcount == 1
+
+    def purge_done(self, older_than: float = 86400.0) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at <= ?", (time.time() - older_than,)
+            )
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WorkerPool:
+    """
+    Threads that claim jobs from a JobQueue and run the handler registered for each job kind.
+    Handlers receive the Job (payload, id for queue.is_current(), ...). A handler that returns
+    completes the job; one that raises fails it (retry or dead letter).
+    Leases of running jobs are extended every visibility_timeout / 3 seconds, so long ingestions
+    are not handed to a second worker. Run more pools (processes or hosts sharing the database
+    file) to scale out.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Job], None]],
+                 workers: int = 4, poll_interval: float = 0.5):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[int, str] = {}  # job id -> worker id
+        self._running_lock = threading.Lock()
+
+    def _worker_id(self, n: int) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{n}"
+
+    def _run_job(self, worker_id: str, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.queue.fail(job.id, worker_id, f"No handler for job kind {job.kind}")
+            return
+        with self._running_lock:
+            self._running[job.id] = worker_id
+        try:
+            handler(job)
+        except Exception as e:
+            logger.exception(f"[WorkerPool] job {job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+            self.queue.fail(job.id, worker_id, str(e))
+        else:
+            self.queue.complete(job.id, worker_id)
+        finally:
+            with self._running_lock:
+                self._running.pop(job.id, None)
+
+    def _work(self, n: int):
+        worker_id = self._worker_id(n)
+        while not self._stop.is_set():
+            try:
+                jobs = self.queue.claim(worker_id, limit=1)
+            except sqlite3.Error as e:
+                logger.warning(f"[WorkerPool] claim failed: {e}")
+                jobs = []
+            if not jobs:
+                self._stop.wait(self.poll_interval)
+                continue
+            for job in jobs:
+                self._run_job(worker_id, job)
+
+    def _heartbeat(self):
+        interval = max(0.1, self.queue.visibility_timeout / 3)
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                running = list(self._running.items())
+            for job_id, worker_id in running:
+                if not self.queue.heartbeat(job_id, worker_id):
+                    logger.warning(f"[WorkerPool] lost lease on job {job_id}")
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, args=(n,), daemon=True) for n in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._heartbeat, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"[WorkerPool] started {self.workers} workers on {self.queue.db_path}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming; running jobs finish (their leases expire if the process dies first)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
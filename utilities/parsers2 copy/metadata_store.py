@@ -0,0 +1,136 @@
+# ingestion/indexing/metadata_store.py
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from ingestion.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id     TEXT PRIMARY KEY,
+    title      TEXT,
+    uri        TEXT,
+    checksum   TEXT,
+    project    TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_hash TEXT PRIMARY KEY,
+    point_id   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_chunks (
+    doc_id     TEXT NOT NULL,
+    pos        INTEGER NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    PRIMARY KEY (doc_id, pos)
+);
+CREATE INDEX IF NOT EXISTS idx_doc_chunks_hash ON doc_chunks (chunk_hash);
+"""
+
+
+class MetadataStore:
+    """
+    Document/chunk bookkeeping on SQLite (WAL mode), keyed by content hash:
+    - documents: one row per document (checksum, title, uri, project)
+    - chunks: chunk hash -> point id, shared by every document containing that text
+    - doc_chunks: (doc id, position) -> chunk hash
+    Each call is one transaction; set_doc_chunks writes only the positions whose hash changed.
+    """
+
+    def __init__(self, db_dsn: Optional[str] = None):
+        # Accepts a file path or a sqlite:/// URL
+        path = db_dsn or os.environ.get("METADATA_DB_PATH", "metadata.db")
+        if path.startswith("sqlite:///"):
+            path = path[len("sqlite:///"):]
+        self.db_path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def get_checksum(self, doc_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT checksum FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_doc_chunk_hashes(self, doc_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk_hash FROM doc_chunks WHERE doc_id = ?", (doc_id,))
+            return {chunk_hash for (chunk_hash,) in rows}
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def add_chunk_if_missing(self, chunk_hash: str, point_id: str):
+        self.add_chunks_if_missing([(chunk_hash, point_id)])
+
+    def add_chunks_if_missing(self, chunks: Iterable[Tuple[str, str]]):
+        """Insert (chunk_hash, point_id) pairs that are not stored yet, in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO chunks (chunk_hash, point_id) VALUES (?, ?)", list(chunks))
+
+    def _delete_orphans(self, chunk_hashes: Iterable[str]):
+        # Chunk rows are shared across documents; drop only those no document references anymore
+        self._conn.executemany(
+            "DELETE FROM chunks WHERE chunk_hash = ? "
+            "AND NOT EXISTS (SELECT 1 FROM doc_chunks WHERE doc_chunks.chunk_hash = chunks.chunk_hash)",
+            [(h,) for h in chunk_hashes],
+        )
+
+    def set_doc_chunks(self, doc_id: str, chunk_infos: List[Dict[str, Any]]):
+        """
+        Make the document's positions match chunk_infos ([{hash, pos, point_id}]).
+        Only positions whose hash changed are written; positions past the new end are deleted.
+        """
+        with self._lock, self._conn:
+            existing = {
+                pos: chunk_hash
+                for pos, chunk_hash in self._conn.execute(
+                    "SELECT pos, chunk_hash FROM doc_chunks WHERE doc_id = ?", (doc_id,)
+                )
+            }
+            new_positions = {ci["pos"]: ci["hash"] for ci in chunk_infos}
+            changed = [(doc_id, pos, h) for pos, h in new_positions.items() if existing.get(pos) != h]
+            dropped = [(doc_id, pos) for pos in existing if pos not in new_positions]
+
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_hash, point_id) VALUES (?, ?)",
+                [(ci["hash"], ci["point_id"]) for ci in chunk_infos if existing.get(ci["pos"]) != ci["hash"]],
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO doc_chunks (doc_id, pos, chunk_hash) VALUES (?, ?, ?)", changed)
+            self._conn.executemany("DELETE FROM doc_chunks WHERE doc_id = ? AND pos = ?", dropped)
+            self._delete_orphans(set(existing.values()) - set(new_positions.values()))
+        logger.info(f"[MetadataStore] {doc_id}: {len(changed)} positions written, {len(dropped)} dropped")
+
+    def set_doc_chunk_hashes(self, doc_id: str, chunk_hashes: Set[str], chunk_infos: List[Dict[str, Any]]):
+        """Compatibility wrapper: the hash set is implied by chunk_infos."""
+        self.set_doc_chunks(doc_id, chunk_infos)
+
+    def upsert_document(self, doc_id: str, title: str, uri: str, checksum: str, project: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, title, uri, checksum, project, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET title = excluded.title, uri = excluded.uri, "
+                "checksum = excluded.checksum, project = excluded.project, updated_at = excluded.updated_at",
+                (doc_id, title, uri, checksum, project, time.time()),
+            )
+
+    def delete_document(self, doc_id: str):
+        with self._lock, self._conn:
+            hashes = {h for (h,) in self._conn.execute("SELECT chunk_hash FROM doc_chunks WHERE doc_id = ?", (doc_id,))}
+            self._conn.execute("DELETE FROM doc_chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._delete_orphans(hashes)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,24 @@
-import io
-import fitz  # PyMuPDF
-import pdfplumber
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from unstructured.partition.pdf import partition_pdf
-from utils.logger import logger
-from exceptions import KnowledgeManagementException
+from ingestion.utils.logger import get_logger
+from ingestion.utils.exceptions import KnowledgeManagementException
+from ingestion.parsers.pdf_session import PDFDocumentSession
+from ingestion.parsers.ocr_cache import elements_to_pairs
+from ingestion.parsers.utils_image import ocr_image_elements
+
+logger = get_logger(__name__)
+
+
+def _parse_page_shard(path: str, start: int, end: int, text_threshold: int, enable_ocr: bool) -> list[dict]:
+    """Worker entry point: parse pages [start, end) of the PDF at path in a separate process."""
+    with open(path, "rb") as f:
+        content = f.read()
+    parser = HybridPDFParser(text_threshold=text_threshold, enable_ocr=enable_ocr)
+    with PDFDocumentSession(content) as session:
+        return parser._parse_page_range(session, start, end)
 
 
 class HybridPDFParser:
@@ -15,61 +30,80 @@ class HybridPDFParser:
     - Deduplicates overlapping table text from PyMuPDF output
     - Runs OCR on embedded images even if text exists
     - Emits separate blocks: {"type": "text"}, {"type": "table"}, {"type": "image_text"}
+    - Optionally splits large documents into page shards parsed by worker processes: the PDF is
+      written once to a temp file that each shard opens by path, on a pool reused across documents
     """
 
-    def __init__(self, text_threshold: int = 100, enable_ocr: bool = True):
+    def __init__(self, text_threshold: int = 100, enable_ocr: bool = True,
+                 max_workers_per_doc: int = 1, pages_per_shard: int = 25, parallel_min_pages: int = 50):
+        """
+        :param max_workers_per_doc: Cap on worker processes one document may use (1 = serial).
+        :param pages_per_shard: Number of consecutive pages handed to a worker at a time.
+        :param parallel_min_pages: Documents shorter than this are always parsed serially.
+        """
         self.text_threshold = text_threshold
         self.enable_ocr = enable_ocr
+        self.max_workers_per_doc = max(1, max_workers_per_doc)
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.parallel_min_pages = parallel_min_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers_per_doc)
+        return self._pool
 
     def _extract_with_pymupdf(self, page) -> list[tuple]:
         """Return list of (bbox, text) blocks from PyMuPDF."""
         return page.get_text("blocks")  # (x0, y0, x1, y1, text, block_no,...)
 
-    def _extract_with_pdfplumber(self, pdf_bytes: bytes, page_num: int) -> tuple[list[str], list[tuple]]:
+    def _extract_with_pdfplumber(self, session: PDFDocumentSession, page_num: int) -> tuple[list[str], list[tuple]]:
         """
-        Extract tables with pdfplumber.
+        Extract tables with pdfplumber from the session's shared document.
         Returns: (table_texts, table_bboxes)
         """
         tables_text, table_bboxes = [], []
         try:
-            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-                page = pdf.pages[page_num]
-                tables = page.find_tables()
-                for table in tables:
-                    table_bboxes.append(table.bbox)
-                    data = table.extract()
-                    if not data:
-                        continue
-                    rows = ["\t".join(cell or "" for cell in row) for row in data if row]
-                    tables_text.append("\n".join(rows))
+            page = session.plumber_page(page_num)
+            tables = page.find_tables()
+            for table in tables:
+                table_bboxes.append(table.bbox)
+                data = table.extract()
+                if not data:
+                    continue
+                rows = ["\t".join(cell or "" for cell in row) for row in data if row]
+                tables_text.append("\n".join(rows))
         except Exception as e:
             logger.warning(f"pdfplumber failed on page {page_num+1}: {e}")
         return tables_text, table_bboxes
 
+    def _blocks_from_ocr(self, pairs: list, page_num: int, source: str) -> list[dict]:
+        """Turn [category, text] OCR pairs into typed blocks."""
+        blocks = []
+        for block_type, text in pairs:
+            if block_type in ("table", "tabular"):
+                blocks.append({
+                    "type": "table",
+                    "text": text,
+                    "metadata": {"page": page_num + 1, "source": source}
+                })
+            else:
+                blocks.append({
+                    "type": "text" if source == "unstructured-ocr" else "image_text",
+                    "text": text,
+                    "metadata": {"page": page_num + 1, "source": source}
+                })
+        return blocks
+
     def _extract_with_ocr(self, page_bytes: bytes, page_num: int, source: str = "unstructured-ocr") -> list[dict]:
-        """Run OCR on a full page or image bytes and return structured blocks."""
+        """Run OCR on a full page and return structured blocks."""
         try:
             elements = partition_pdf(
                 file_content=page_bytes,
                 strategy="hi_res",
                 ocr_strategy="ocr_only",
             )
-            blocks = []
-            for el in elements:
-                block_type = getattr(el, "category", "text").lower()
-                if block_type in ("table", "tabular"):
-                    blocks.append({
-                        "type": "table",
-                        "text": str(el),
-                        "metadata": {"page": page_num + 1, "source": source}
-                    })
-                else:
-                    blocks.append({
-                        "type": "text" if source == "unstructured-ocr" else "image_text",
-                        "text": str(el),
-                        "metadata": {"page": page_num + 1, "source": source}
-                    })
-            return blocks
+            return self._blocks_from_ocr(elements_to_pairs(elements), page_num, source)
         except Exception as e:
             raise KnowledgeManagementException(
                 f"OCR extraction failed on page {page_num+1}: {e}",
@@ -78,7 +112,7 @@ class HybridPDFParser:
             )
 
     def _extract_images_with_ocr(self, page, page_num: int) -> list[dict]:
-        """Extract and OCR all images from a page."""
+        """Extract and OCR all images from a page (through the shared OCR cache)."""
         results = []
         for img_index, img in enumerate(page.get_images(full=True)):
             try:
@@ -86,7 +120,7 @@ class HybridPDFParser:
                 base_image = page.parent.extract_image(xref)
                 img_bytes = base_image["image"]
 
-                ocr_blocks = self._extract_with_ocr(img_bytes, page_num, source="image-ocr")
+                ocr_blocks = self._blocks_from_ocr(ocr_image_elements(img_bytes), page_num, source="image-ocr")
                 for blk in ocr_blocks:
                     blk["metadata"]["image_index"] = img_index
                 results.extend(ocr_blocks)
@@ -94,63 +128,106 @@ class HybridPDFParser:
                 logger.warning(f"OCR on image {img_index} (page {page_num+1}) failed: {e}")
         return results
 
-    def parse(self, content: bytes) -> list[dict]:
+    def _parse_page(self, session: PDFDocumentSession, page_num: int) -> list[dict]:
         results = []
-        try:
-            doc = fitz.open(stream=content, filetype="pdf")
-
-            for page_num, page in enumerate(doc):
-                # Step 1: extract raw blocks from PyMuPDF
-                pymupdf_blocks = self._extract_with_pymupdf(page)
-                raw_text_blocks = [
-                    (bbox, txt)
-                    for (x0, y0, x1, y1, txt, *_)
-                    in pymupdf_blocks
-                    if txt and txt.strip()
-                    for bbox in [(x0, y0, x1, y1)]
-                ]
-                raw_text = " ".join(txt for _, txt in raw_text_blocks)
-
-                if len(raw_text.strip()) > self.text_threshold:
-                    # Step 2: extract tables with pdfplumber (directly from memory)
-                    tables_text, table_bboxes = self._extract_with_pdfplumber(content, page_num)
-
-                    # Step 3: filter PyMuPDF blocks that overlap with table bboxes
-                    for (x0, y0, x1, y1), txt in raw_text_blocks:
-                        overlaps = any(
-                            (x0 < tbx1 and x1 > tbx0 and y0 < tby1 and y1 > tby0)
-                            for (tbx0, tby0, tbx1, tby1) in table_bboxes
-                        )
-                        if not overlaps:
-                            results.append({
-                                "type": "text",
-                                "text": txt.strip(),
-                                "metadata": {"page": page_num + 1, "source": "pymupdf"}
-                            })
-
-                    # Add tables as separate blocks
-                    for tbl in tables_text:
-                        results.append({
-                            "type": "table",
-                            "text": tbl.strip(),
-                            "metadata": {"page": page_num + 1, "source": "pdfplumber"}
-                        })
-
-                    # Step 4: OCR all images on this page (extra step)
-                    if self.enable_ocr:
-                        image_ocr_blocks = self._extract_images_with_ocr(page, page_num)
-                        results.extend(image_ocr_blocks)
-
-                else:
-                    # OCR fallback for low-text pages
-                    if self.enable_ocr:
-                        page_bytes = doc.tobytes([page_num])
-                        ocr_blocks = self._extract_with_ocr(page_bytes, page_num)
-                        results.extend(ocr_blocks)
-                    else:
-                        logger.warning(f"Page {page_num+1} skipped (low text, OCR disabled)")
+        page = session.fitz_page(page_num)
+
+        # Step 1: extract raw blocks from PyMuPDF
+        pymupdf_blocks = self._extract_with_pymupdf(page)
+        raw_text_blocks = [
+            (bbox, txt)
+            for (x0, y0, x1, y1, txt, *_)
+            in pymupdf_blocks
+            if txt and txt.strip()
+            for bbox in [(x0, y0, x1, y1)]
+        ]
+        raw_text = " ".join(txt for _, txt in raw_text_blocks)
+
+        if len(raw_text.strip()) > self.text_threshold:
+            # Step 2: extract tables with pdfplumber (directly from memory)
+            tables_text, table_bboxes = self._extract_with_pdfplumber(session, page_num)
+
+            # Step 3: filter PyMuPDF blocks that overlap with table bboxes
+            for (x0, y0, x1, y1), txt in raw_text_blocks:
+                overlaps = any(
+                    (x0 < tbx1 and x1 > tbx0 and y0 < tby1 and y1 > tby0)
+                    for (tbx0, tby0, tbx1, tby1) in table_bboxes
+                )
+                if not overlaps:
+                    results.append({
+                        "type": "text",
+                        "text": txt.strip(),
+                        "metadata": {"page": page_num + 1, "source": "pymupdf"}
+                    })
 
+            # Add tables as separate blocks
+            for tbl in tables_text:
+                results.append({
+                    "type": "table",
+                    "text": tbl.strip(),
+                    "metadata": {"page": page_num + 1, "source": "pdfplumber"}
+                })
+
+            # Step 4: OCR all images on this page (extra step)
+            if self.enable_ocr:
+                image_ocr_blocks = self._extract_images_with_ocr(page, page_num)
+                results.extend(image_ocr_blocks)
+
+        else:
+            # OCR fallback for low-text pages
+            if self.enable_ocr:
+                page_bytes = session.page_pdf_bytes(page_num)
+                ocr_blocks = self._extract_with_ocr(page_bytes, page_num)
+                results.extend(ocr_blocks)
+            else:
+                logger.warning(f"Page {page_num+1} skipped (low text, OCR disabled)")
+
+        return results
+
+    def _parse_page_range(self, session: PDFDocumentSession, start: int, end: int) -> list[dict]:
+        results = []
+        for page_num in range(start, end):
+            results.extend(self._parse_page(session, page_num))
+            session.release_page(page_num)
+        return results
+
+    def _parse_parallel(self, content: bytes, page_count: int) -> list[dict]:
+        """Parse page shards on worker processes and merge the blocks back in page order."""
+        shards = [
+            (start, min(start + self.pages_per_shard, page_count))
+            for start in range(0, page_count, self.pages_per_shard)
+        ]
+        workers = min(self.max_workers_per_doc, len(shards))
+        logger.info(f"Parsing {page_count} pages in {len(shards)} shards on {workers} workers")
+
+        # Shards get a path rather than a pickled copy of the PDF bytes each
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(content)
+        futures = []
+        try:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_parse_page_shard, f.name, start, end, self.text_threshold, self.enable_ocr)
+                for start, end in shards
+            ]
+            # Collect in submission order so blocks stay in page order
+            results = []
+            for future in futures:
+                results.extend(future.result())
             return results
+        finally:
+            for future in futures:
+                future.cancel()
+            os.unlink(f.name)
+
+    def parse(self, content: bytes) -> list[dict]:
+        try:
+            with PDFDocumentSession(content) as session:
+                page_count = session.page_count
+                if not (self.max_workers_per_doc > 1 and page_count >= self.parallel_min_pages):
+                    return self._parse_page_range(session, 0, page_count)
+
+            return self._parse_parallel(content, page_count)
 
         except Exception as e:
             raise KnowledgeManagementException(
@@ -158,3 +235,8 @@ class HybridPDFParser:
                 None,
                 "HybridPDFParser"
             )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
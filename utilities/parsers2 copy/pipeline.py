@@ -2,11 +2,12 @@
 import hashlib
 import uuid
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ingestion.parsers.parser_factory import ParserFactory
 from ingestion.preprocessing.cleaner import TextCleaner
 from ingestion.chunking.smart_chunker import SmartChunker
 from ingestion.embedding.embedder import Embedder
+from ingestion.embedding.embedding_cache import EmbeddingCache, embed_with_cache
 from ingestion.indexing.vector_index import VectorIndex
 from ingestion.indexing.sparse_index import SparseIndex
 from ingestion.indexing.metadata_store import MetadataStore
@@ -25,10 +26,13 @@ def chunk_point_id_from_hash(chunk_hash: str) -> str:
 
 
 class IngestionPipeline:
-    def __init__(self):
+    def __init__(self, embedding_cache: Optional[EmbeddingCache] = None, embedder=None):
         self.cleaner = TextCleaner()            # should canonicalize text consistently
         self.chunker = SmartChunker()           # deterministic chunking
-        self.embedder = Embedder()
+        # pass a shared EmbeddingService to micro-batch across concurrent ingestions
+        self.embedder = embedder or Embedder()
+        # content-addressed embeddings shared across documents and versions (None disables)
+        self.embedding_cache = embedding_cache
         self.vector_index = VectorIndex()
         self.sparse_index = SparseIndex()
         self.metadata_store = MetadataStore()   # must support per-chunk persistence
@@ -77,10 +81,11 @@ class IngestionPipeline:
             hashes_to_infos = {ci["hash"]: ci for ci in new_chunk_infos}
             added_infos = [hashes_to_infos[h] for h in new_chunk_infos if h["hash"] in added_hashes]  # preserve order
 
-            # 7. Embed added chunks only (batch)
+            # 7. Embed added chunks only (batch); chunks embedded before for any doc come from the cache
             if added_infos:
                 texts = [ci["text"] for ci in added_infos]
-                embeddings = self.embedder.embed_batch(texts)
+                embeddings = embed_with_cache(self.embedder, self.embedding_cache,
+                                              [ci["hash"] for ci in added_infos], texts)
                 # upsert to vector DB with stable point ids
                 points = []
                 for emb, ci in zip(embeddings, added_infos):
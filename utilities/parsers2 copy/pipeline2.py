@@ -1,10 +1,11 @@
 # ingestion/pipeline.py
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ingestion.parsers.parser_factory import ParserFactory
 from ingestion.preprocessing.cleaner import TextCleaner
 from ingestion.chunking.stable_chunker import StableChunker
 from ingestion.embedding.embedder import Embedder
+from ingestion.embedding.embedding_cache import EmbeddingCache, embed_with_cache
 from ingestion.indexing.vector_index import VectorIndex
 from ingestion.indexing.sparse_index import SparseIndex
 from ingestion.indexing.metadata_store import MetadataStore
@@ -16,10 +17,12 @@ logger = get_logger(__name__)
 
 
 class IngestionPipeline:
-    def __init__(self, db_dsn: str):
+    def __init__(self, db_dsn: str, embedding_cache: Optional[EmbeddingCache] = None, embedder=None):
         self.cleaner = TextCleaner()
         self.chunker = StableChunker()
-        self.embedder = Embedder()
+        # pass a shared EmbeddingService to micro-batch across concurrent ingestions
+        self.embedder = embedder or Embedder()
+        self.embedding_cache = embedding_cache
         self.vector_index = VectorIndex()
         self.sparse_index = SparseIndex()
         self.metadata = MetadataStore(db_dsn)
@@ -67,7 +70,9 @@ class IngestionPipeline:
             added_infos = [ci for ci in new_infos if ci["hash"] in added]
             if added_infos:
                 texts = [ci["text"] for ci in added_infos]
-                embeddings = self.embedder.embed_batch(texts)
+                # only true cache misses reach the model
+                embeddings = embed_with_cache(self.embedder, self.embedding_cache,
+                                              [ci["hash"] for ci in added_infos], texts)
 
                 points = []
                 sparse_docs = []
@@ -81,9 +86,8 @@ class IngestionPipeline:
                 # index in sparse
                 self.sparse_index.index_chunks(sparse_docs)
 
-                # ensure chunk rows exist
-                for ci in added_infos:
-                    self.metadata.add_chunk_if_missing(ci["hash"], ci["point_id"])
+                # ensure chunk rows exist (one transaction for the whole batch)
+                self.metadata.add_chunks_if_missing((ci["hash"], ci["point_id"]) for ci in added_infos)
 
             # DELETE removed chunks
             if removed:
@@ -105,11 +109,12 @@ class IngestionPipeline:
 
     def delete_document(self, doc_id: str):
         try:
-            hashes = self.metadata.get_doc_chunk_hashes(doc_id)
+            hashes = self.metadata.get_doc_chunk_hashes(doc_id) or set()
             if hashes:
                 point_ids = [point_id_from_chunk_hash(h) for h in hashes]
                 self.vector_index.delete_points(point_ids)
-                self.sparse_index.delete_chunks_by_ids(point_ids)
+            # Server-side by doc_id: also catches chunks the metadata store no longer lists
+            self.sparse_index.delete_by_doc_id(doc_id)
             self.metadata.delete_document(doc_id)
             logger.info(f"Deleted document {doc_id} and {len(hashes)} chunks")
         except Exception as e:
@@ -5,9 +5,6 @@ import hashlib
 from collections import Counter
 from typing import List, Dict, Optional
 
-import cv2
-import numpy as np
-from PIL import Image
 import io
 
 
@@ -144,6 +141,11 @@ class Preprocessor:
         - adaptive threshold
         - deskew (basic)
         """
+        # Imported here: OpenCV/PIL are only needed for OCR and are slow to load
+        import cv2
+        import numpy as np
+        from PIL import Image
+
         img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
         arr = np.array(img)
 
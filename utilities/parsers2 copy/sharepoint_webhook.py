@@ -1,4 +1,5 @@
 import requests
+from typing import Callable, Optional
 from ingestion.utils.logger import get_logger
 from ingestion.utils.exceptions import KnowledgeManagementException
 from ingestion.pipeline import run_ingestion
@@ -34,7 +35,13 @@ class SharePointWebhookProcessor:
             raise KnowledgeManagementException(f"Failed to fetch item metadata: {resp.text}")
         return resp.json()
 
-    def process_event(self, event: dict, site_id: str, drive_id: str):
+    def process_event(self, event: dict, site_id: str, drive_id: str,
+                      is_current: Optional[Callable[[], bool]] = None):
+        """
+        Ingest or delete the item an event refers to. is_current (e.g. JobQueue.is_current for the
+        job) is checked before each expensive step; once a newer event for the item has arrived
+        the work is dropped.
+        """
         try:
             event_type = event.get("changeType", "updated")
             item_id = event.get("resourceData", {}).get("id")
@@ -48,6 +55,10 @@ class SharePointWebhookProcessor:
                 run_ingestion(None, doc_id=item_id, project="SharePointProject", event_type="deleted")
                 return
 
+            if is_current is not None and not is_current():
+                logger.info(f"Event for {item_id} superseded, skipping")
+                return
+
             metadata = self.fetch_item_metadata(site_id, drive_id, item_id)
             file_name = metadata.get("name")
             download_url = metadata.get("@microsoft.graph.downloadUrl")
@@ -56,6 +67,10 @@ class SharePointWebhookProcessor:
                 logger.warning(f"No download URL for {file_name}, skipping")
                 return
 
+            if is_current is not None and not is_current():
+                logger.info(f"Event for {file_name} superseded, skipping")
+                return
+
             logger.info(f"Triggering ingestion for {file_name}, event={event_type}")
             run_ingestion(download_url, doc_id=item_id, project="SharePointProject", event_type=event_type)
 
@@ -1,24 +1,140 @@
 # ingestion/indexing/sparse_index.py
-from typing import List, Dict, Any
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from opensearchpy import OpenSearch
+from ingestion.utils.logger import get_logger
+from ingestion.utils.exceptions import KnowledgeManagementException
+
+logger = get_logger(__name__)
+
 
 class SparseIndex:
-    def __init__(self, hosts=None, index_name="docs"):
+    """
+    OpenSearch keyword index written through the _bulk API:
+    - Actions are serialized to NDJSON and split into requests of at most max_batch_bytes
+    - Up to max_concurrency bulk requests are in flight at once
+    - refresh: None (index default), "false", "true" or "wait_for", applied per bulk request
+    - Per-item failures are collected across the whole batch, then raised as one
+      KnowledgeManagementException so callers never commit metadata for a partial write
+    """
+
+    def __init__(self, hosts=None, index_name="docs", max_batch_bytes: int = 5 * 1024 * 1024,
+                 max_concurrency: int = 4, refresh: Optional[str] = None, timeout: int = 60,
+                 doc_id_field: str = "metadata.doc_id.keyword"):
         hosts = hosts or ["http://localhost:9200"]
-        self.client = OpenSearch(hosts)
+        self.client = OpenSearch(hosts, pool_maxsize=max_concurrency, timeout=timeout)
         self.index = index_name
+        self.max_batch_bytes = max_batch_bytes
+        self.max_concurrency = max_concurrency
+        self.refresh = refresh
+        # Dynamic mappings index strings as text with an exact-match .keyword sub-field
+        self.doc_id_field = doc_id_field
+
+    # --------------------------
+    # Bulk plumbing
+    # --------------------------
+    def _batches(self, actions: Iterable[Tuple[str, bytes]]) -> Iterator[Tuple[List[str], bytes]]:
+        """Group (id, ndjson lines) actions into bulk bodies no larger than max_batch_bytes."""
+        ids: List[str] = []
+        lines: List[bytes] = []
+        size = 0
+        for _id, data in actions:
+            # A single oversized action is still sent, alone
+            if lines and size + len(data) > self.max_batch_bytes:
+                yield ids, b"".join(lines)
+                ids, lines, size = [], [], 0
+            ids.append(_id)
+            lines.append(data)
+            size += len(data)
+        if lines:
+            yield ids, b"".join(lines)
+
+    def _send(self, batch: Tuple[List[str], bytes], ignore_status=()) -> List[Dict[str, Any]]:
+        ids, body = batch
+        params = {"refresh": self.refresh} if self.refresh else {}
+        try:
+            response = self.client.bulk(body=body, index=self.index, params=params)
+        except Exception as e:
+            # Transport-level failure: every item of this request failed
+            return [{"id": _id, "status": None, "error": str(e)} for _id in ids]
+        if not response.get("errors"):
+            return []
+        errors = []
+        for item in response.get("items", []):
+            result = next(iter(item.values()))
+            status = result.get("status")
+            if result.get("error") is not None and status not in ignore_status:
+                errors.append({"id": result.get("_id"), "status": status, "error": result.get("error")})
+        return errors
 
-    def index_chunks(self, chunks: List[Dict[str, Any]]):
+    def _bulk(self, actions: Iterable[Tuple[str, bytes]], ignore_status=()) -> Dict[str, Any]:
+        total = 0
+        errors: List[Dict[str, Any]] = []
+        batches = self._batches(actions)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            # Bounded window of in-flight requests so large inputs are not serialized up front
+            inflight = []
+            for batch in batches:
+                total += len(batch[0])
+                inflight.append(pool.submit(self._send, batch, ignore_status))
+                if len(inflight) >= self.max_concurrency * 2:
+                    errors.extend(inflight.pop(0).result())
+            for future in inflight:
+                errors.extend(future.result())
+        report = {"total": total, "succeeded": total - len(errors), "errors": errors}
+        if errors:
+            logger.warning(f"[SparseIndex] {len(errors)}/{total} bulk items failed on {self.index}: {errors[:3]}")
+            raise KnowledgeManagementException(
+                f"{len(errors)}/{total} bulk items failed on {self.index}: {errors[:3]}", report, "SparseIndex"
+            )
+        return report
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def index_chunks(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         # chunks: list of {id, text, metadata}
-        for c in chunks:
-            self.client.index(index=self.index, id=c["id"], body={"text": c["text"], "metadata": c.get("metadata", {})})
+        def actions():
+            for c in chunks:
+                meta = json.dumps({"index": {"_id": c["id"]}})
+                source = json.dumps({"text": c["text"], "metadata": c.get("metadata", {})})
+                yield c["id"], f"{meta}\n{source}\n".encode("utf-8")
+
+        report = self._bulk(actions())
+        logger.info(f"[SparseIndex] indexed {report['succeeded']}/{report['total']} chunks to {self.index}")
+        return report
 
-    def delete_chunks_by_ids(self, ids: List[str]):
+    def delete_chunks_by_ids(self, ids: List[str]) -> Dict[str, Any]:
         if not ids:
-            return
-        for _id in ids:
-            try:
-                self.client.delete(index=self.index, id=_id)
-            except Exception:
-                # ignore missing docs
-                pass
\ No newline at end of file
+            return {"total": 0, "succeeded": 0, "errors": []}
+
+        def actions():
+            for _id in ids:
+                yield _id, (json.dumps({"delete": {"_id": _id}}) + "\n").encode("utf-8")
+
+        # Missing docs are not errors
+        report = self._bulk(actions(), ignore_status=(404,))
+        logger.info(f"[SparseIndex] deleted {report['succeeded']}/{report['total']} chunks from {self.index}")
+        return report
+
+    def delete_by_doc_id(self, doc_id: str) -> int:
+        """Delete every chunk whose metadata.doc_id matches, server-side; returns the deleted count."""
+        params = {"conflicts": "proceed"}
+        if self.refresh:
+            # delete_by_query only accepts a boolean refresh
+            params["refresh"] = "true" if self.refresh in ("true", "wait_for") else "false"
+        response = self.client.delete_by_query(
+            index=self.index,
+            body={"query": {"term": {self.doc_id_field: doc_id}}},
+            params=params,
+        )
+        failures = response.get("failures") or []
+        if failures:
+            logger.warning(f"[SparseIndex] delete_by_query for {doc_id} had {len(failures)} failures: {failures[:3]}")
+            raise KnowledgeManagementException(
+                f"delete_by_query for {doc_id} had {len(failures)} failures: {failures[:3]}", doc_id, "SparseIndex"
+            )
+        deleted = response.get("deleted", 0)
+        logger.info(f"[SparseIndex] deleted {deleted} chunks of {doc_id} from {self.index}")
+        return deleted
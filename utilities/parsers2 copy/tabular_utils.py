@@ -1,5 +1,6 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 
 def determine_column_types(df: pd.DataFrame):
     """
@@ -16,41 +17,140 @@ def determine_column_types(df: pd.DataFrame):
     return text_cols, meta_cols
 
 
+def build_row_texts(df: pd.DataFrame, text_cols: List[str]) -> np.ndarray:
+    """
+    Embedding text of every row: its non-null text columns joined by spaces (" " if none).
+    Built column-wise with pandas string ops instead of per-row access.
+    """
+    joined = pd.Series("", index=df.index, dtype=object)
+    for col in text_cols:
+        values = df[col]
+        joined = joined + (" " + values.astype(str)).where(values.notna(), "")
+    texts = joined.str.slice(1).str.strip()
+    return texts.where(texts != "", " ").to_numpy(dtype=object)
+
+
+def chunk_row_bounds(lengths: np.ndarray, max_text_length: int, stride: Optional[int] = None,
+                     final: bool = True, min_end: int = 0) -> List[Tuple[int, int]]:
+    """
+    [start, end) row ranges whose space-joined text reaches max_text_length (the last may be shorter).
+    stride=None: each range starts where the previous ended (no overlap).
+    stride=k: ranges start every k rows and always end at least one row after the previous one.
+    final=False: more rows follow, so stop before the first range that does not reach
+    max_text_length within these rows; the next range starts at bounds[-1][1] (stride=None)
+    or bounds[-1][0] + stride. min_end carries the previous batch's last end + 1 (stride mode).
+    """
+    n = len(lengths)
+    if n == 0:
+        return []
+    # cum[i] = joined length of rows [0, i) plus one trailing separator
+    cum = np.concatenate(([0], np.cumsum(np.asarray(lengths, dtype=np.int64) + 1)))
+
+    if stride is None:
+        bounds = []
+        start = 0
+        while start < n:
+            end = int(np.searchsorted(cum, cum[start] + max_text_length + 1, side="left"))
+            if end > n and not final:
+                break
+            end = min(max(end, start + 1), n)
+            bounds.append((start, end))
+            start = end
+        return bounds
+
+    starts = np.arange(0, n, max(1, stride))
+    ends = np.searchsorted(cum, cum[starts] + max_text_length + 1, side="left")
+    ends = np.maximum(ends, starts + 1)
+    ends[0] = max(ends[0], min_end)
+    # Force strictly increasing ends: ends[i] = max(ends[i], ends[i-1] + 1)
+    offsets = np.arange(len(ends))
+    ends = np.maximum.accumulate(ends - offsets) + offsets
+    if not final:
+        # Ranges past n still need rows from the next batch
+        complete = int(np.searchsorted(ends, n, side="right"))
+        return list(zip(starts[:complete].tolist(), ends[:complete].tolist()))
+    # Stop at the first range that reaches the last row
+    last = int(np.searchsorted(ends, n, side="left"))
+    ends = np.minimum(ends, n)
+    return list(zip(starts[:last + 1].tolist(), ends[:last + 1].tolist()))
+
+
+def _row_lengths(texts: np.ndarray) -> np.ndarray:
+    return np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+
+
 def create_embedding_chunks(
     df: pd.DataFrame,
     text_cols: List[str],
-    meta_cols: List[str],
     max_text_length: int = 500,
-    slide_window: int = 1
+    stride: Optional[int] = None,
+    row_offset: int = 0
 ) -> List[Dict]:
     """
     Create chunks for embedding:
-    - Combines multiple rows until max_text_length reached
-    - Keeps metadata for each row
-    """
-    chunks = []
-    current_texts = []
-    current_meta = []
-
-    for idx in range(len(df)):
-        row = df.iloc[idx]
-        text_content = " ".join([str(row[col]) for col in text_cols if pd.notna(row[col])]).strip()
-        row_meta = {col: row[col] for col in meta_cols}
-
-        if not text_content:
-            text_content = " "
-
-        current_texts.append(text_content)
-        current_meta.append(row_meta)
-
-        combined_text = " ".join(current_texts)
-        if len(combined_text.strip()) >= max_text_length or idx == len(df) - 1:
-            chunks.append({
-                "text": combined_text,
-                "metadata": {"rows": current_meta}
-            })
-            # Slide window
-            current_texts = current_texts[slide_window:]
-            current_meta = current_meta[slide_window:]
-
-    return chunks
+    - Combines consecutive rows until max_text_length is reached
+    - Chunk boundaries come from cumulative row-text lengths (see chunk_row_bounds)
+    - Metadata is only the row range [row_start, row_end); metadata columns (see
+      determine_column_types) are not copied into chunks, join them back from the source rows
+    - row_offset is added to the row range (position of df's first row in the source)
+    """
+    texts = build_row_texts(df, text_cols)
+    return [
+        {
+            "text": " ".join(texts[start:end]),
+            "metadata": {"row_start": row_offset + start, "row_end": row_offset + end}
+        }
+        for start, end in chunk_row_bounds(_row_lengths(texts), max_text_length, stride)
+    ]
+
+
+def iter_embedding_chunks(
+    batches: Iterable[pd.DataFrame],
+    text_cols: List[str],
+    max_text_length: int = 500,
+    stride: Optional[int] = None
+) -> Iterator[Dict]:
+    """
+    Streaming create_embedding_chunks over consecutive row batches (e.g. read_csv(chunksize=...)).
+    Chunks are yielded as soon as their rows are in; only the rows of the pending, not yet
+    complete window are carried into the next batch. Output matches create_embedding_chunks
+    on the concatenated frame.
+    """
+    pending = np.empty(0, dtype=object)
+    base = 0  # source row of pending[0]
+    skip = 0  # rows to drop before the next range start (stride larger than a range)
+    total = 0  # source rows seen
+    last_end = -1  # source row where the last emitted range ended
+
+    def emit(texts, bounds):
+        for start, end in bounds:
+            yield {
+                "text": " ".join(texts[start:end]),
+                "metadata": {"row_start": base + start, "row_end": base + end}
+            }
+
+    for df in batches:
+        texts = build_row_texts(df, text_cols)
+        total += len(texts)
+        if skip:
+            dropped = min(skip, len(texts))
+            texts = texts[dropped:]
+            skip -= dropped
+        texts = np.concatenate((pending, texts)) if len(pending) else texts
+        bounds = chunk_row_bounds(_row_lengths(texts), max_text_length, stride, final=False,
+                                  min_end=last_end + 1 - base)
+        yield from emit(texts, bounds)
+
+        if bounds:
+            last_end = base + bounds[-1][1]
+            next_start = bounds[-1][1] if stride is None else bounds[-1][0] + max(1, stride)
+        else:
+            next_start = 0
+        pending = texts[next_start:]
+        skip += max(0, next_start - len(texts))
+        base += next_start
+
+    if last_end < total:
+        # As in chunk_row_bounds(final=True), nothing follows a range that reached the last row
+        yield from emit(pending, chunk_row_bounds(_row_lengths(pending), max_text_length, stride,
+                                                  min_end=last_end + 1 - base))
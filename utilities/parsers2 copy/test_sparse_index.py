@@ -0,0 +1,100 @@
+# ingestion/indexing/test_sparse_index.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from ingestion.indexing.sparse_index import SparseIndex
+from ingestion.utils.exceptions import KnowledgeManagementException
+
+
+class _StandInOpenSearch(BaseHTTPRequestHandler):
+    """Answers _bulk and _delete_by_query like OpenSearch; ids starting with "bad" fail."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        path, _, query = self.path.partition("?")
+        self.server.requests.append((path, query, body))
+        if path.endswith("/_delete_by_query"):
+            self._reply({"deleted": 3, "failures": []})
+            return
+
+        lines = body.decode("utf-8").splitlines()
+        items, pos = [], 0
+        while pos < len(lines):
+            op, meta = next(iter(json.loads(lines[pos]).items()))
+            pos += 1 if op == "delete" else 2
+            if meta["_id"].startswith("bad"):
+                result = {"_id": meta["_id"], "status": 400, "error": {"type": "mapper_parsing_exception"}}
+            elif op == "delete" and meta["_id"].startswith("missing"):
+                result = {"_id": meta["_id"], "status": 404, "error": {"type": "not_found"}}
+            else:
+                result = {"_id": meta["_id"], "status": 201 if op == "index" else 200}
+            items.append({op: result})
+        self._reply({"took": 1, "errors": any("error" in next(iter(i.values())) for i in items), "items": items})
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StandInOpenSearch)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _index(server, **kwargs) -> SparseIndex:
+    return SparseIndex(hosts=[f"http://127.0.0.1:{server.server_address[1]}"], **kwargs)
+
+
+def _chunks(ids):
+    return [{"id": _id, "text": f"text of {_id} " * 10, "metadata": {"doc_id": "d1"}} for _id in ids]
+
+
+def test_index_chunks_splits_bulk_bodies_by_size(server):
+    index = _index(server, max_batch_bytes=1024, max_concurrency=2, refresh="wait_for")
+    report = index.index_chunks(_chunks([f"c{i}" for i in range(50)]))
+
+    assert report == {"total": 50, "succeeded": 50, "errors": []}
+    bulk = [r for r in server.requests if r[0] == "/docs/_bulk"]
+    assert len(bulk) > 1
+    assert all(len(body) <= 1024 for _, _, body in bulk)
+    assert all("refresh=wait_for" in query for _, query, _ in bulk)
+    sent = [json.loads(line)["index"]["_id"] for _, _, body in bulk
+            for line in body.decode("utf-8").splitlines() if line.startswith('{"index"')]
+    assert sorted(sent) == sorted(f"c{i}" for i in range(50))
+
+
+def test_index_chunks_raises_with_failed_items(server):
+    index = _index(server, max_batch_bytes=1024)
+    with pytest.raises(KnowledgeManagementException) as excinfo:
+        index.index_chunks(_chunks(["c1", "bad1", "c2", "bad2"]))
+
+    message = str(excinfo.value)
+    assert "2/4 bulk items failed" in message
+    assert "bad1" in message and "bad2" in message
+
+
+def test_delete_chunks_by_ids_ignores_missing(server):
+    report = _index(server).delete_chunks_by_ids(["c1", "missing1"])
+    assert report == {"total": 2, "succeeded": 2, "errors": []}
+
+
+def test_delete_by_doc_id_queries_the_keyword_field(server):
+    assert _index(server).delete_by_doc_id("d1") == 3
+    path, query, body = server.requests[-1]
+    assert path == "/docs/_delete_by_query"
+    assert "conflicts=proceed" in query
+    assert json.loads(body) == {"query": {"term": {"metadata.doc_id.keyword": "d1"}}}
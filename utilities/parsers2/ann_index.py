@@ -0,0 +1,161 @@
+# indexing/ann_index.py
+from typing import List, Optional
+import numpy as np
+from utils.logger import logger
+
+
+class IVFFlatIndex:
+    """
+    IVF-flat candidate generator for VectorIndex:
+    - k-means centroids trained on a sample of the collection
+    - Each row is filed in the inverted list of its nearest centroid
+    - A query scans only the rows of its `nprobe` nearest lists (higher nprobe = better recall, slower)
+    - Upserts/deletes update the lists incrementally; stale entries are dropped lazily on the next probe
+    The index stores row numbers only; vectors stay in the host matrix.
+    """
+
+    def __init__(self, nlist: int = 1024, nprobe: int = 16, metric: str = "cosine",
+                 kmeans_iters: int = 20, points_per_centroid: int = 64, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.metric = metric
+        self.kmeans_iters = kmeans_iters
+        self.points_per_centroid = points_per_centroid
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None     # (nlist, dim) float32
+        self._assign = np.full(0, -1, dtype=np.int32)   # row -> list id (-1 = not filed)
+        self._lists: List[np.ndarray] = []
+        self._pending: List[List[int]] = []
+        self._stale = np.zeros(0, dtype=np.int64)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    # --------------------------
+    # Training
+    # --------------------------
+    def _nearest(self, vectors: np.ndarray, centroids: np.ndarray, n: int = 1, block: int = 4096) -> np.ndarray:
+        """Indices of the `n` best centroids per vector (inner product for cosine/dot, distance for l2)."""
+        c_norms = np.einsum("ij,ij->i", centroids, centroids) if self.metric == "l2" else None
+        out = np.empty((vectors.shape[0], n), dtype=np.int64)
+        for start in range(0, vectors.shape[0], block):
+            scores = vectors[start:start + block] @ centroids.T
+            if c_norms is not None:
+                scores = 2.0 * scores - c_norms[None, :]
+            if n == 1:
+                out[start:start + block, 0] = np.argmax(scores, axis=1)
+            else:
+                top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+                order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+                out[start:start + block] = np.take_along_axis(top, order, axis=1)
+        return out
+
+    def train(self, vectors: np.ndarray):
+        """Run k-means over `vectors` (already normalized for cosine). Clears any filed rows."""
+        x = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        nlist = max(1, min(self.nlist, x.shape[0] // 4))
+        max_train = nlist * self.points_per_centroid
+        if x.shape[0] > max_train:
+            x = x[rng.choice(x.shape[0], max_train, replace=False)]
+
+        centroids = x[rng.choice(x.shape[0], nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = self._nearest(x, centroids)[:, 0]
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+            centroids[filled] = np.add.reduceat(x[order], starts, axis=0) / counts[filled][:, None]
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                # Re-seed empty clusters from random training points
+                centroids[empty] = x[rng.choice(x.shape[0], len(empty), replace=False)]
+            if self.metric == "cosine":
+                norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+                centroids /= np.where(norms == 0, 1.0, norms)
+
+        self._set_centroids(centroids)
+        logger.info(f"[IVFFlatIndex] trained {nlist} lists on {x.shape[0]} vectors")
+
+    def _set_centroids(self, centroids: np.ndarray):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        nlist = self.centroids.shape[0]
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._pending = [[] for _ in range(nlist)]
+        self._stale = np.zeros(nlist, dtype=np.int64)
+        self._assign = np.full(0, -1, dtype=np.int32)
+
+    def load(self, centroids: np.ndarray, assign: np.ndarray):
+        """Restore a trained index from persisted centroids and row -> list assignments."""
+        self._set_centroids(centroids)
+        self._assign = np.array(assign, dtype=np.int32)
+        filed = np.flatnonzero(self._assign >= 0)
+        order = filed[np.argsort(self._assign[filed], kind="stable")]
+        counts = np.bincount(self._assign[filed], minlength=len(self._lists))
+        self._lists = list(np.split(order.astype(np.int64), np.cumsum(counts)[:-1]))
+
+    # --------------------------
+    # Incremental updates
+    # --------------------------
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        if rows.max() >= len(self._assign):
+            grown = np.full(max(int(rows.max()) + 1, len(self._assign) * 2), -1, dtype=np.int32)
+            grown[:len(self._assign)] = self._assign
+            self._assign = grown
+
+        lids = self._nearest(np.asarray(vectors, dtype=np.float32), self.centroids)[:, 0]
+        old = self._assign[rows]
+        for row, lid, prev in zip(rows.tolist(), lids.tolist(), old.tolist()):
+            if prev == lid:
+                continue
+            if prev >= 0:
+                self._stale[prev] += 1
+            self._pending[lid].append(row)
+        self._assign[rows] = lids
+
+    def remove(self, rows: np.ndarray):
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < len(self._assign)]
+        prev = self._assign[rows]
+        filed = prev >= 0
+        np.add.at(self._stale, prev[filed], 1)
+        self._assign[rows[filed]] = -1
+
+    def _list_rows(self, lid: int) -> np.ndarray:
+        if self._pending[lid] or self._stale[lid]:
+            rows = self._lists[lid]
+            if self._pending[lid]:
+                rows = np.concatenate((rows, np.asarray(self._pending[lid], dtype=np.int64)))
+                self._pending[lid] = []
+            if self._stale[lid]:
+                # A row removed and re-filed here before compaction would otherwise appear twice
+                rows = np.unique(rows[self._assign[rows] == lid])
+                self._stale[lid] = 0
+            self._lists[lid] = rows
+        return self._lists[lid]
+
+    # --------------------------
+    # Search
+    # --------------------------
+    def candidates(self, queries: np.ndarray, nprobe: Optional[int] = None) -> List[np.ndarray]:
+        """Candidate rows for each query: the union of its `nprobe` nearest lists."""
+        nprobe = max(1, min(nprobe or self.nprobe, len(self._lists)))
+        probes = self._nearest(np.asarray(queries, dtype=np.float32), self.centroids, n=nprobe)
+        out = []
+        for lids in probes:
+            parts = [self._list_rows(lid) for lid in lids.tolist()]
+            out.append(np.concatenate(parts) if parts else np.empty(0, dtype=np.int64))
+        return out
+
+    def assignments(self, rows: int) -> np.ndarray:
+        """Row -> list id for the first `rows` rows (-1 = not filed), for persistence."""
+        out = np.full(rows, -1, dtype=np.int32)
+        n = min(rows, len(self._assign))
+        out[:n] = self._assign[:n]
+        return out
@@ -1,8 +1,19 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class BaseParser(ABC):
     @abstractmethod
     def parse(self, content: bytes) -> list[dict]:
         """Return list of blocks with text + metadata."""
-        pass
\ No newline at end of file
+        pass
+
+    def iter_blocks(self, content: bytes) -> Iterator[dict]:
+        """Yield blocks one at a time. Parsers that can stream override this."""
+        yield from self.parse(content)
+
+    def iter_file_blocks(self, path: str) -> Iterator[dict]:
+        """Like iter_blocks, for a file on disk. Parsers that can avoid loading it whole override this."""
+        with open(path, "rb") as f:
+            content = f.read()
+        yield from self.iter_blocks(content)
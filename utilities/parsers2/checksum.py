@@ -9,3 +9,10 @@ def calculate_text_checksum(text: str, algo="sha256") -> str:
     h = hashlib.new(algo)
     h.update(text.encode("utf-8"))
     return h.hexdigest()
+
+def calculate_file_checksum(path: str, algo="sha256", block_size: int = 1 << 20) -> str:
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
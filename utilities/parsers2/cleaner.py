@@ -1,5 +1,6 @@
 import re
 import string
+from typing import Iterable, Iterator
 from nltk.corpus import stopwords
 from utils.logger import logger
 from exceptions import KnowledgeManagementException
@@ -14,35 +15,39 @@ class TextCleaner:
         self.config = config
         self.stopwords = set(stopwords.words("english"))
 
-    def clean(self, blocks: list[dict]) -> list[dict]:
-        cleaned_blocks = []
-        try:
-            for block in blocks:
-                text = block["text"]
+    def _clean_text(self, text: str) -> str:
+        if self.config.get("lowercase", False):
+            text = text.lower()
 
-                if self.config.get("lowercase", False):
-                    text = text.lower()
+        if self.config.get("remove_punctuation", False):
+            text = text.translate(str.maketrans("", "", string.punctuation))
 
-                if self.config.get("remove_punctuation", False):
-                    text = text.translate(str.maketrans("", "", string.punctuation))
+        if self.config.get("normalize_whitespace", False):
+            text = re.sub(r"\s+", " ", text).strip()
 
-                if self.config.get("normalize_whitespace", False):
-                    text = re.sub(r"\s+", " ", text).strip()
+        if self.config.get("remove_stopwords", False):
+            words = [w for w in text.split() if w not in self.stopwords]
+            text = " ".join(words)
 
-                if self.config.get("remove_stopwords", False):
-                    words = [w for w in text.split() if w not in self.stopwords]
-                    text = " ".join(words)
+        return text
 
-                cleaned_blocks.append({
-                    "text": text,
+    def iter_clean(self, blocks: Iterable[dict]) -> Iterator[dict]:
+        """Generator form of clean(): consumes and yields blocks one at a time."""
+        try:
+            for block in blocks:
+                yield {
+                    "text": self._clean_text(block["text"]),
                     "metadata": block["metadata"]
-                })
-
-            return cleaned_blocks
+                }
 
+        except KnowledgeManagementException:
+            raise
         except Exception as e:
             raise KnowledgeManagementException(
                 f"Text cleaning failed: {e}",
                 None,
                 "TextCleaner"
             )
+
+    def clean(self, blocks: list[dict]) -> list[dict]:
+        return list(self.iter_clean(blocks))
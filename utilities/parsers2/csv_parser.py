@@ -1,46 +1,49 @@
 import pandas as pd
 import io
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 from exceptions import KnowledgeManagementException
+from .base import BaseParser
 from utils.logger import logger
-from utils.csv_utils import determine_column_types, create_embedding_chunks
+from utils.csv_utils import determine_column_types, iter_embedding_chunks
 
 
-class HybridCSVParser:
+class HybridCSVParser(BaseParser):
     """
     Hybrid CSV parser:
     - Separates text columns for embeddings and metadata columns for filtering
-    - Creates chunks using sliding window approach to optimize embeddings
+    - Creates chunks from consecutive row ranges (stride=None: no overlap, stride=k: new window every k rows)
     - Includes fallback for rows/chunks with no text
+    - Streams the file in batches of batch_size rows; column roles come from the first sample_rows
+      rows, so memory stays bounded by one batch regardless of file size
     """
 
-    def __init__(self, max_text_length: int = 500, slide_window: int = 1, fallback_text: str = "N/A"):
+    def __init__(self, max_text_length: int = 500, stride: Optional[int] = None, fallback_text: str = "N/A",
+                 batch_size: int = 50000, sample_rows: int = 1000):
         self.max_text_length = max_text_length
-        self.slide_window = slide_window
+        self.stride = stride
         self.fallback_text = fallback_text
+        self.batch_size = batch_size
+        self.sample_rows = sample_rows
 
-    def parse(self, content: bytes) -> List[Dict]:
+    def iter_blocks(self, content: bytes) -> Iterator[Dict]:
         try:
-            df = pd.read_csv(io.BytesIO(content))
-            if df.empty:
+            sample = pd.read_csv(io.BytesIO(content), nrows=self.sample_rows)
+            if sample.empty:
                 logger.warning("CSV file is empty")
-                return []
-
-            text_cols, meta_cols = determine_column_types(df)
-            chunks = create_embedding_chunks(
-                df,
-                text_cols,
-                meta_cols,
-                max_text_length=self.max_text_length,
-                slide_window=self.slide_window
-            )
-
-            # Fallback: ensure chunks with no text get a placeholder
-            for chunk in chunks:
-                if not chunk["text"].strip():
-                    chunk["text"] = self.fallback_text
-
-            return chunks
+                return
+
+            text_cols, _ = determine_column_types(sample)
+            # Text columns stay strings in every batch, whatever a single batch's values look like
+            batches = pd.read_csv(io.BytesIO(content), chunksize=self.batch_size,
+                                  dtype={col: str for col in text_cols})
+            with batches:
+                for chunk in iter_embedding_chunks(batches, text_cols,
+                                                   max_text_length=self.max_text_length,
+                                                   stride=self.stride):
+                    # Fallback: ensure chunks with no text get a placeholder
+                    if not chunk["text"].strip():
+                        chunk["text"] = self.fallback_text
+                    yield chunk
 
         except Exception as e:
             raise KnowledgeManagementException(
@@ -48,3 +51,6 @@ class HybridCSVParser:
                 None,
                 "HybridCSVParser"
             )
+
+    def parse(self, content: bytes) -> List[Dict]:
+        return list(self.iter_blocks(content))
@@ -4,12 +4,13 @@ from typing import List, Dict, Any
 
 import docx
 from unstructured.partition.docx import partition_docx
-from unstructured.partition.image import partition_image
 from utils.logger import logger
 from exceptions import KnowledgeManagementException
+from .base import BaseParser
+from .ocr_executor import get_ocr_executor
 
 
-class HybridDocxParser:
+class HybridDocxParser(BaseParser):
     """
     Hybrid DOCX parser:
     - Extracts text natively from paragraphs
@@ -64,50 +65,27 @@ class HybridDocxParser:
 
     def _ocr_images_only(self, image_blobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        OCR each image blob using Unstructured's partition_image (in-memory).
-        Returns list of blocks derived from images (text/table/image_text).
+        OCR all image blobs as one batch on the shared OCR executor (in-memory, cached).
+        Returns list of blocks derived from images (text/table/image_text), in image_index order.
         """
         ocr_blocks: List[Dict[str, Any]] = []
         if not image_blobs:
             return ocr_blocks
 
-        for img in image_blobs:
-            img_idx = img.get("image_index")
-            blob = img.get("blob")
-            if not blob:
-                continue
-
-            try:
-                # Run Unstructured partition_image on the in-memory image bytes.
-                # We request hi_res layout to improve detection of tables/structured content.
-                elements = partition_image(
-                    file_content=blob,
-                    strategy="hi_res",
-                    ocr_strategy="ocr_only"
-                )
-
-                for el in elements:
-                    cat = getattr(el, "category", "text").lower()
-                    text = str(el).strip()
-                    if not text:
-                        continue
-
-                    # Normalize categories -> use 'table' and 'text'; mark image-derived text specially
-                    if cat in ("table", "tabular"):
-                        block_type = "table"
-                    else:
-                        # use 'image_text' to indicate origin from image OCR
-                        block_type = "image_text"
-
-                    ocr_blocks.append({
-                        "type": block_type,
-                        "text": text,
-                        "metadata": {"source": "docx-image-ocr", "image_index": img_idx}
-                    })
+        for img, pairs in get_ocr_executor().ocr_images(image_blobs):
+            for cat, text in pairs:
+                # Normalize categories -> use 'table' and 'text'; mark image-derived text specially
+                if cat in ("table", "tabular"):
+                    block_type = "table"
+                else:
+                    # use 'image_text' to indicate origin from image OCR
+                    block_type = "image_text"
 
-            except Exception as e:
-                logger.warning(f"OCR failed for DOCX image {img_idx}: {e}")
-                # continue with other images
+                ocr_blocks.append({
+                    "type": block_type,
+                    "text": text,
+                    "metadata": {"source": "docx-image-ocr", "image_index": img.get("image_index")}
+                })
 
         return ocr_blocks
 
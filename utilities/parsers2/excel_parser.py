@@ -1,45 +1,164 @@
 # ingestion/parsers/excel_parser.py
 import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Dict, Iterator, Optional, Tuple, Union
 import pandas as pd
-from typing import List, Dict
 from utils.logger import logger
 from exceptions import KnowledgeManagementException
-from ingestion.parsers.csv_utils import determine_column_types, create_embedding_chunks
+from .base import BaseParser
+from ingestion.parsers.csv_utils import determine_column_types, create_embedding_chunks, iter_embedding_chunks
 
-class HybridExcelParser:
+
+def _header_names(header: Tuple[Any, ...]) -> List[str]:
+    # Same names pandas would give: "Unnamed: i" for blanks, ".n" suffixes for duplicates
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = str(value) if value is not None else f"Unnamed: {i}"
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        names.append(f"{name}.{count}" if count else name)
+    return names
+
+
+def _iter_sheet_rows(ws) -> Iterator[Tuple[Any, ...]]:
+    """Data rows of a read-only worksheet; empty rows are held back so trailing ones are dropped."""
+    blank = []
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        if all(value is None for value in row):
+            blank.append(row)
+            continue
+        if blank:
+            yield from blank
+            blank = []
+        yield row
+
+
+def _row_batches(rows: Iterator[Tuple[Any, ...]], columns: List[str], batch_size: int) -> Iterator[pd.DataFrame]:
+    width = len(columns)
+    batch = []
+    for row in rows:
+        # Read-only rows can be shorter or longer than the header
+        batch.append(row[:width] + (None,) * (width - len(row)))
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch, columns=columns, dtype=object)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=columns, dtype=object)
+
+
+def iter_sheet_chunks(source: Union[bytes, str], sheet_name: str, max_text_length: int = 500, stride: Optional[int] = None,
+                      batch_size: int = 5000, sample_rows: int = 1000) -> Iterator[Dict]:
+    """
+    Stream one worksheet (from workbook bytes or a file path) with openpyxl read-only mode:
+    rows are read lazily in batches of batch_size, column roles come from the first sample_rows
+    rows, and chunks (with the sheet name in metadata) are yielded as soon as their rows are read.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(source) if isinstance(source, bytes) else source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        header = next(ws.iter_rows(max_row=1, values_only=True), None)
+        if not header:
+            return
+        columns = _header_names(header)
+        batches = _row_batches(_iter_sheet_rows(ws), columns, batch_size)
+
+        first = next(batches, None)
+        if first is None:
+            return
+        # Object frames keep cell values as-is; infer_objects gives the sample its real dtypes
+        text_cols, _ = determine_column_types(first.head(sample_rows).infer_objects())
+
+        def all_batches():
+            yield first
+            yield from batches
+
+        for chunk in iter_embedding_chunks(all_batches(), text_cols, max_text_length=max_text_length, stride=stride):
+            chunk["metadata"]["sheet"] = sheet_name
+            yield chunk
+    finally:
+        wb.close()
+
+
+def _sheet_chunks(path: str, sheet_name: str, max_text_length: int, stride: Optional[int],
+                  batch_size: int, sample_rows: int) -> List[Dict]:
+    # Worker entry point: reads the workbook from a path; a sheet's chunks cross back as one list
+    return list(iter_sheet_chunks(path, sheet_name, max_text_length, stride, batch_size, sample_rows))
+
+
+class HybridExcelParser(BaseParser):
     """
     Hybrid Excel parser:
-    - Reads all sheets in the Excel file
+    - Streams .xlsx sheets with openpyxl read-only mode instead of loading every sheet at once
     - Uses column type detection to split text vs metadata
     - Creates embedding-ready chunks
     - Adds sheet name in metadata
+    - Workbooks with several sheets are split across up to max_workers processes, one sheet per task:
+      the workbook is written once to a temp file that each worker opens by path, and every task
+      returns its whole sheet's chunks as one list, yielded in workbook order
+    - Legacy .xls files (not zip based) go through pandas
     """
-    def __init__(self, max_text_length: int = 500, slide_window: int = 1):
+    def __init__(self, max_text_length: int = 500, stride: Optional[int] = None,
+                 batch_size: int = 5000, sample_rows: int = 1000, max_workers: Optional[int] = None):
         self.max_text_length = max_text_length
-        self.slide_window = slide_window
+        self.stride = stride
+        self.batch_size = batch_size
+        self.sample_rows = sample_rows
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
 
-    def parse(self, content: bytes) -> List[Dict]:
-        all_chunks = []
-        try:
-            # Read all sheets into a dict of DataFrames
-            sheets: Dict[str, pd.DataFrame] = pd.read_excel(io.BytesIO(content), sheet_name=None)
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
 
-            for sheet_name, df in sheets.items():
-                if df.empty:
-                    continue
+    def _iter_xls_chunks(self, content: bytes) -> Iterator[Dict]:
+        sheets: Dict[str, pd.DataFrame] = pd.read_excel(io.BytesIO(content), sheet_name=None)
+        for sheet_name, df in sheets.items():
+            if df.empty:
+                continue
+            text_cols, _ = determine_column_types(df)
+            for ch in create_embedding_chunks(df, text_cols,
+                                              max_text_length=self.max_text_length,
+                                              stride=self.stride):
+                ch['metadata']['sheet'] = sheet_name
+                yield ch
 
-                text_cols, meta_cols = determine_column_types(df)
-                chunks = create_embedding_chunks(df, text_cols, meta_cols,
-                                                 max_text_length=self.max_text_length,
-                                                 slide_window=self.slide_window)
-                # Add sheet name in metadata
-                for ch in chunks:
-                    ch['metadata']['sheet'] = sheet_name
+    def iter_blocks(self, content: bytes) -> Iterator[Dict]:
+        try:
+            if not zipfile.is_zipfile(io.BytesIO(content)):
+                yield from self._iter_xls_chunks(content)
+                return
 
-                all_chunks.extend(chunks)
+            from openpyxl import load_workbook
+            wb = load_workbook(io.BytesIO(content), read_only=True)
+            sheet_names = wb.sheetnames
+            wb.close()
 
+            args = (self.max_text_length, self.stride, self.batch_size, self.sample_rows)
+            if len(sheet_names) < 2 or self.max_workers < 2:
+                for sheet_name in sheet_names:
+                    yield from iter_sheet_chunks(content, sheet_name, *args)
+                return
 
-            return all_chunks
+            # Workers get a path rather than a pickled copy of the workbook bytes each
+            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as f:
+                f.write(content)
+            futures = []
+            try:
+                pool = self._get_pool()
+                futures = [pool.submit(_sheet_chunks, f.name, sheet_name, *args) for sheet_name in sheet_names]
+                for future in futures:
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+                # Tasks still running after an early exit only lose a result nobody reads
+                os.unlink(f.name)
 
         except Exception as e:
             logger.exception(f"Failed to parse Excel file: {e}")
@@ -48,3 +167,11 @@ class HybridExcelParser:
                 None,
                 "HybridExcelParser",
             )
+
+    def parse(self, content: bytes) -> List[Dict]:
+        return list(self.iter_blocks(content))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -1,48 +1,73 @@
 # main.py
-from fastapi import FastAPI, Request, BackgroundTasks
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from connectors.sharepoint import SharePointConnector
 from pipeline import IngestionPipeline
+from ingestion.job_queue import Job, JobQueue, WorkerPool
 from utils.logger import logger
 
 app = FastAPI()
-pipeline = IngestionPipeline()
+# The API only records work; ingestion runs in worker processes (python main1.py).
+# Events for one item are coalesced: a save burst becomes one ingest, a trailing delete wins.
+queue = JobQueue(debounce=5.0)
+
+
+def _sharepoint_connector() -> SharePointConnector:
+    # Configure SharePoint connection from env/config in prod
+    return SharePointConnector(
+        tenant_id="YOUR_TENANT",
+        client_id="YOUR_CLIENT_ID",
+        client_secret="YOUR_CLIENT_SECRET",
+        site_id="YOUR_SITE_ID",
+        drive_id="YOUR_DRIVE_ID"
+    )
 
-# Configure SharePoint connection from env/config in prod
-sp = SharePointConnector(
-    tenant_id="YOUR_TENANT",
-    client_id="YOUR_CLIENT_ID",
-    client_secret="YOUR_CLIENT_SECRET",
-    site_id="YOUR_SITE_ID",
-    drive_id="YOUR_DRIVE_ID"
-)
 
 @app.post("/sharepoint/webhook")
-async def sharepoint_webhook(request: Request, background_tasks: BackgroundTasks):
+async def sharepoint_webhook(request: Request):
     payload = await request.json()
-    logger.info(f"[Webhook] received: {payload}")
 
     # Graph sends notifications in 'value' array
+    jobs = []
     for event in payload.get("value", []):
         # Graph resourceData contains id and other details
         rd = event.get("resourceData", {})
         item_id = rd.get("id")
         change_type = event.get("changeType")  # created, updated, deleted
+        if not item_id:
+            continue
 
-        # Use background tasks to quickly ack webhook and process async
         if change_type == "deleted":
             # doc_id strategy: use SharePoint item id as doc_id
-            doc_id = item_id
-            background_tasks.add_task(pipeline.delete_document, doc_id)
-            logger.info(f"[Webhook] scheduled delete for {doc_id}")
+            jobs.append(("delete", {"doc_id": item_id}, item_id))
         else:
-            # created or updated
-            try:
-                content = sp.fetch_file(item_id)
-                # Prefer stable doc_id: use SharePoint item id
-                filename = rd.get("name") or f"{item_id}"
-                background_tasks.add_task(pipeline.ingest, filename, content)
-                logger.info(f"[Webhook] scheduled ingest for {filename}")
-            except Exception as e:
-                logger.exception(f"[Webhook] failed to fetch file {item_id}: {e}")
+            # created or updated: the file is downloaded by the worker
+            jobs.append(("ingest", {"item_id": item_id, "filename": rd.get("name") or f"{item_id}"}, item_id))
 
+    # sqlite commit: keep it off the event loop
+    queued = await run_in_threadpool(queue.enqueue_many, jobs)
+    logger.info(f"[Webhook] queued {queued} jobs")
     return {"status": "accepted"}
+
+
+def run_workers(workers: int = 4):
+    """Ingestion worker process: claims webhook jobs until interrupted."""
+    # One pipeline for all worker threads: VectorIndex, SparseIndex and MetadataStore serialize their own writes
+    pipeline = IngestionPipeline()
+    sp = _sharepoint_connector()
+
+    def ingest(job: Job):
+        content = sp.fetch_file(job.payload["item_id"])
+        if not queue.is_current(job.id):
+            logger.info(f"[Worker] {job.payload['filename']} changed again, skipping superseded ingest")
+            return
+        pipeline.ingest(job.payload["filename"], content)
+
+    def delete(job: Job):
+        pipeline.delete_document(job.payload["doc_id"])
+
+    WorkerPool(queue, {"ingest": ingest, "delete": delete}, workers=workers).run_forever()
+
+
+if __name__ == "__main__":
+    run_workers()
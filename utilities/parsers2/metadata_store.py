@@ -1 +1,125 @@
+# indexing/metadata_store.py
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+from utils.logger import logger
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id     TEXT PRIMARY KEY,
+    title      TEXT,
+    uri        TEXT,
+    checksum   TEXT,
+    project    TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id   TEXT PRIMARY KEY,
+    doc_id     TEXT NOT NULL,
+    position   INTEGER NOT NULL,
+    checksum   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks (doc_id, position);
+"""
+
+
+class MetadataStore:
+    """
+    Local document/chunk bookkeeping on SQLite (WAL mode):
+    - documents: one row per document (checksum, title, uri, project)
+    - chunks: chunk id -> (doc id, position, checksum), indexed by (doc id, position)
+    - Writes for a document run in one transaction with executemany; upsert_document
+      only touches chunk rows whose checksum changed
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get("METADATA_DB_PATH", "metadata.db")
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _chunk_map(self, doc_id: str) -> Dict[str, str]:
+        rows = self._conn.execute(
+            "SELECT chunk_id, checksum FROM chunks WHERE doc_id = ? ORDER BY position", (doc_id,)
+        )
+        return {chunk_id: checksum for chunk_id, checksum in rows}
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, uri, checksum, project, updated_at FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            title, uri, checksum, project, updated_at = row
+            return {
+                "doc_id": doc_id,
+                "title": title,
+                "uri": uri,
+                "checksum": checksum,
+                "project": project,
+                "updated_at": updated_at,
+                "chunks": self._chunk_map(doc_id),
+            }
+
+    def get_chunks(self, doc_id: str) -> Dict[str, str]:
+        """{chunk_id: checksum} for a document, in position order."""
+        with self._lock:
+            return self._chunk_map(doc_id)
+
+    def remove_chunks(self, doc_id: str, chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE doc_id = ? AND chunk_id = ?", [(doc_id, cid) for cid in chunk_ids]
+            )
+
+    def upsert_document(self, doc_id: str, title: str, uri: str, checksum: str, project: str,
+                        chunks: Optional[List[Dict[str, Any]]] = None):
+        """
+        Insert/update the document row and, when `chunks` ([{id, checksum}] in position order) is given,
+        make the stored chunk list match it by writing only the rows that differ.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, title, uri, checksum, project, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET title = excluded.title, uri = excluded.uri, "
+                "checksum = excluded.checksum, project = excluded.project, updated_at = excluded.updated_at",
+                (doc_id, title, uri, checksum, project, time.time()),
+            )
+            if chunks is None:
+                return
+
+            existing = {
+                chunk_id: (position, chunk_checksum)
+                for chunk_id, position, chunk_checksum in self._conn.execute(
+                    "SELECT chunk_id, position, checksum FROM chunks WHERE doc_id = ?", (doc_id,)
+                )
+            }
+            changed = [
+                (c["id"], doc_id, position, c["checksum"])
+                for position, c in enumerate(chunks)
+                if existing.get(c["id"]) != (position, c["checksum"])
+            ]
+            keep = {c["id"] for c in chunks}
+            removed = [(doc_id, chunk_id) for chunk_id in existing if chunk_id not in keep]
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, doc_id, position, checksum) VALUES (?, ?, ?, ?)", changed
+            )
+            self._conn.executemany("DELETE FROM chunks WHERE doc_id = ? AND chunk_id = ?", removed)
+        logger.info(f"[MetadataStore] {doc_id}: {len(changed)} chunk rows written, {len(removed)} removed")
+
+    def delete_document(self, doc_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
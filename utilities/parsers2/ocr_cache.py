@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from utils.logger import logger
+
+# Bump when OCR engines/settings change so stale results are not reused
+OCR_CACHE_VERSION = "1"
+
+
+class OCRCache:
+    """
+    Content-addressed cache of OCR results shared by all parsers:
+    - Key = sha256(image bytes) + OCR strategy + cache version
+    - In-memory LRU tier in front of an on-disk tier (one JSON file per key)
+    - Disk tier evicts least-recently-used files once it exceeds max_disk_bytes
+    - Values are the raw OCR elements as [category, text] pairs; parsers build their own blocks
+    """
+
+    def __init__(self, cache_dir: Optional[str] = ".cache/ocr", max_memory_items: int = 2048,
+                 max_disk_bytes: int = 512 * 1024 * 1024, version: str = OCR_CACHE_VERSION):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.version = version
+        self._memory: "OrderedDict[str, List[List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    def make_key(self, blob: bytes, strategy: str) -> str:
+        digest = hashlib.sha256(blob).hexdigest()
+        return hashlib.sha256(f"{digest}:{strategy}:{self.version}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _scan_disk(self):
+        """Yield (path, size, mtime) for every cached entry on disk."""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def _remember(self, key: str, elements: List[List[str]]):
+        self._memory[key] = elements
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, blob: bytes, strategy: str) -> Optional[List[List[str]]]:
+        key = self.make_key(blob, strategy)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    elements = json.load(f)
+                # Touch so disk eviction treats this entry as recently used
+                os.utime(path, None)
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, elements)
+                return elements
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"[OCRCache] unreadable cache entry {key}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, blob: bytes, strategy: str, elements: List[List[str]]):
+        key = self.make_key(blob, strategy)
+        with self._lock:
+            self._remember(key, elements)
+
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps(elements).encode("utf-8")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            # Atomic so concurrent worker processes never see partial entries
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[OCRCache] failed to write cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def get_or_compute(self, blob: bytes, strategy: str,
+                       compute: Callable[[bytes], List[List[str]]]) -> List[List[str]]:
+        elements = self.get(blob, strategy)
+        if elements is None:
+            elements = compute(blob)
+            self.put(blob, strategy, elements)
+        return elements
+
+    def _evict_disk(self):
+        """Delete least-recently-used entries until the disk tier is back under 90% of budget."""
+        entries = sorted(self._scan_disk(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
+        logger.info(f"[OCRCache] evicted {removed} entries, disk tier now {total} bytes")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_default_cache: Optional[OCRCache] = None
+
+
+def get_ocr_cache() -> OCRCache:
+    """Process-wide OCR cache; OCR_CACHE_DIR overrides the on-disk location."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OCRCache(cache_dir=os.environ.get("OCR_CACHE_DIR", ".cache/ocr"))
+    return _default_cache
+
+
+def elements_to_pairs(elements) -> List[List[str]]:
+    """Reduce Unstructured elements to cacheable [category, text] pairs."""
+    pairs = []
+    for el in elements:
+        text = str(el).strip()
+        if text:
+            pairs.append([getattr(el, "category", "text").lower(), text])
+    return pairs
@@ -0,0 +1,118 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple
+from utils.logger import logger
+from .ocr_cache import OCRCache, get_ocr_cache
+from .utils_image import UNSTRUCTURED_OCR_STRATEGY, _partition_image_pairs
+
+
+# Conservative default: OCR executors live inside ingestion workers that are themselves pooled
+DEFAULT_OCR_WORKERS = 2
+
+
+class OCRExecutor:
+    """
+    Bounded process pool for OCR of embedded images:
+    - Parsers submit every image of a document (or slide) as one batch
+    - Identical images in a batch are OCRed once
+    - Cache hits are answered in the calling process; only misses reach the pool
+    - Each image waits at most `timeout` seconds; failed/timed-out images are skipped, and after
+      a timeout the pool is recycled (workers killed) so a hung OCR call cannot hold a slot,
+      and images still queued behind it are resubmitted to the fresh pool
+    - Results come back in the original image_index order
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: float = 120.0,
+                 cache: Optional[OCRCache] = None):
+        self.max_workers = max_workers or min(DEFAULT_OCR_WORKERS, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.cache = cache or get_ocr_cache()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _recycle_pool(self):
+        """Kill the pool's workers (shutdown alone leaves a running task running) and start fresh on next use."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        kill_workers = getattr(pool, "kill_workers", None)  # Python 3.14+
+        if kill_workers is not None:
+            kill_workers()
+        else:
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def ocr_images(self, image_blobs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[List[str]]]]:
+        """
+        OCR a batch of {"image_index", "blob", ...} dicts.
+        Returns [(image_dict, [[category, text], ...])] in input order; images that fail are omitted.
+        """
+        results: List[Optional[List[List[str]]]] = [None] * len(image_blobs)
+        # Identical blobs (logos, repeated icons) share one lookup and one OCR call
+        positions: Dict[bytes, List[int]] = {}
+        for pos, img in enumerate(image_blobs):
+            blob = img.get("blob")
+            if blob:
+                positions.setdefault(hashlib.sha256(blob).digest(), []).append(pos)
+
+        pending = []
+        for group in positions.values():
+            blob = image_blobs[group[0]]["blob"]
+            cached = self.cache.get(blob, UNSTRUCTURED_OCR_STRATEGY)
+            if cached is not None:
+                for pos in group:
+                    results[pos] = cached
+            else:
+                pending.append(group)
+
+        while pending:
+            pool = self._get_pool()
+            futures = [(group, pool.submit(_partition_image_pairs, image_blobs[group[0]]["blob"])) for group in pending]
+            pending = []
+            for n, (group, future) in enumerate(futures):
+                img_idx = image_blobs[group[0]].get("image_index")
+                try:
+                    pairs = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    logger.warning(f"OCR timed out after {self.timeout}s for image {img_idx}")
+                    # The hung call keeps its worker busy: kill the pool, resubmit what had not finished
+                    unfinished = [(g, f) for g, f in futures[n + 1:] if not f.done()]
+                    futures[n + 1:] = [(g, f) for g, f in futures[n + 1:] if f.done()]
+                    pending = [g for g, _ in unfinished]
+                    self._recycle_pool()
+                    continue
+                except Exception as e:
+                    logger.warning(f"OCR failed for image {img_idx}: {e}")
+                    continue
+                self.cache.put(image_blobs[group[0]]["blob"], UNSTRUCTURED_OCR_STRATEGY, pairs)
+                for pos in group:
+                    results[pos] = pairs
+
+        return [(img, pairs) for img, pairs in zip(image_blobs, results) if pairs is not None]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+_default_executor: Optional[OCRExecutor] = None
+
+
+def get_ocr_executor() -> OCRExecutor:
+    """
+    Process-wide OCR executor; OCR_MAX_WORKERS (default DEFAULT_OCR_WORKERS) and
+    OCR_TIMEOUT_SECONDS override the defaults.
+    """
+    global _default_executor
+    if _default_executor is None:
+        max_workers = int(os.environ["OCR_MAX_WORKERS"]) if os.environ.get("OCR_MAX_WORKERS") else None
+        timeout = float(os.environ.get("OCR_TIMEOUT_SECONDS", 120))
+        _default_executor = OCRExecutor(max_workers=max_workers, timeout=timeout)
+    return _default_executor
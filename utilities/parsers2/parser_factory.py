@@ -1,63 +1,115 @@
+import importlib
 import os
-import magic
-from .hybrid_pdf_parser import HybridPDFParser
-from .hybrid_docx_parser import HybridDocxParser
-from .hybrid_pptx_parser import HybridPPTXParser
-from .hybrid_excel_parser import HybridExcelParser
-from .hybrid_csv_parser import HybridCSVParser
-from .hybrid_txt_parser import HybridTXTParser
-from preprocessing.cleaner import TextCleaner
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
 from utils.config_loader import ConfigLoader
 from utils.logger import logger
 from exceptions import KnowledgeManagementException
 
+# libmagic identifies every registered type from the first few KB
+_MIME_SNIFF_BYTES = 8192
+
+
+class ParserSpec(NamedTuple):
+    """Where a parser lives and how to build it; the module is only imported on first use."""
+    module: str
+    class_name: str
+    config_section: str
+    kwargs: Callable[[ConfigLoader], Dict[str, Any]] = lambda cfg: {}
+
 
 class ParserFactory:
     """
     Factory to select the right parser (by extension or MIME type)
     and apply preprocessing as defined in config.
+    - Parser modules (and their heavy dependencies) are imported on first use of an extension
+    - The config, MIME detector, parser and cleaner instances are built once and reused
+    - import_times() reports how long each parser module took to import
     """
 
-    _config = ConfigLoader()
-
     _mime_map = {
         "application/pdf": ".pdf",
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
         "application/vnd.openxmlformats-officedocument.presentationml.presentation": ".pptx",
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx",
+        "application/vnd.ms-excel": ".xls",
         "text/plain": ".txt",
         "text/csv": ".csv",
     }
 
-    _parsers = {
-        ".pdf": lambda cfg: HybridPDFParser(
+    _registry: Dict[str, ParserSpec] = {
+        ".pdf": ParserSpec("pdf_parser", "HybridPDFParser", "pdf", lambda cfg: dict(
             text_threshold=cfg.get("pdf", "text_threshold", 100),
             enable_ocr=cfg.get("pdf", "enable_ocr", True),
-        ),
-        ".docx": lambda cfg: HybridDocxParser(
+        )),
+        ".docx": ParserSpec("docx_parser", "HybridDocxParser", "docx", lambda cfg: dict(
             text_threshold=cfg.get("docx", "text_threshold", 30),
-            enable_ocr_images=cfg.get("docx", "enable_ocr_images", True),
-        ),
-        ".pptx": lambda cfg: HybridPPTXParser(
+            enable_ocr=cfg.get("docx", "enable_ocr_images", True),
+        )),
+        ".pptx": ParserSpec("ppt_parser", "HybridPPTXParser", "pptx", lambda cfg: dict(
             text_threshold=cfg.get("pptx", "text_threshold", 50),
-            enable_ocr_images=cfg.get("pptx", "enable_ocr_images", True),
-        ),
-        ".xlsx": lambda cfg: HybridExcelParser(),
-        ".xls": lambda cfg: HybridExcelParser(),
-        ".csv": lambda cfg: HybridCSVParser(),
-        ".txt": lambda cfg: HybridTXTParser(),
+            enable_ocr=cfg.get("pptx", "enable_ocr_images", True),
+        )),
+        ".xlsx": ParserSpec("excel_parser", "HybridExcelParser", "excel"),
+        ".xls": ParserSpec("excel_parser", "HybridExcelParser", "excel"),
+        ".csv": ParserSpec("csv_parser", "HybridCSVParser", "csv"),
+        ".txt": ParserSpec("txt_parser", "HybridTXTParser", "txt"),
     }
 
+    _lock = threading.RLock()
+    _magic_lock = threading.Lock()
+    _config: Optional[ConfigLoader] = None
+    _magic = None
+    _parsers: Dict[str, Any] = {}
+    _cleaners: Dict[str, Any] = {}
+    _import_times: Dict[str, float] = {}
+
+    @classmethod
+    def _get_config(cls) -> ConfigLoader:
+        if cls._config is None:
+            with cls._lock:
+                if cls._config is None:
+                    cls._config = ConfigLoader()
+        return cls._config
+
+    @classmethod
+    def _detect_mime(cls, content: bytes) -> str:
+        if cls._magic is None:
+            with cls._lock:
+                if cls._magic is None:
+                    import magic
+                    cls._magic = magic.Magic(mime=True)
+        # libmagic handles are not safe to share between threads mid-call
+        with cls._magic_lock:
+            return cls._magic.from_buffer(content)
+
+    @classmethod
+    def _import_parser_class(cls, spec: ParserSpec):
+        if spec.module not in cls._import_times:
+            start = time.perf_counter()
+            module = importlib.import_module(f".{spec.module}", __package__)
+            cls._import_times[spec.module] = time.perf_counter() - start
+            logger.info(f"Imported {spec.module} in {cls._import_times[spec.module]:.2f}s")
+        else:
+            module = importlib.import_module(f".{spec.module}", __package__)
+        return getattr(module, spec.class_name)
+
+    @classmethod
+    def import_times(cls) -> Dict[str, float]:
+        """Seconds spent importing each parser module loaded so far."""
+        return dict(cls._import_times)
+
     @classmethod
     def _detect_extension(cls, filename: str, content: bytes) -> str:
         # First check actual extension
         ext = os.path.splitext(filename)[-1].lower()
-        if ext in cls._parsers:
+        if ext in cls._registry:
             return ext
 
         # Fallback to MIME detection
         try:
-            mime = magic.Magic(mime=True).from_buffer(content)
+            mime = cls._detect_mime(content)
             detected_ext = cls._mime_map.get(mime)
             if detected_ext:
                 logger.info(f"Detected MIME {mime}, mapped to {detected_ext}")
@@ -72,26 +124,79 @@ class ParserFactory:
         )
 
     @classmethod
-    def parse_and_clean(cls, filename: str, content: bytes) -> list[dict]:
-        ext = cls._detect_extension(filename, content)
-        parser_builder = cls._parsers.get(ext)
+    def _get_parser_for(cls, ext: str):
+        parser = cls._parsers.get(ext)
+        if parser is not None:
+            return parser
 
-        if not parser_builder:
+        spec = cls._registry.get(ext)
+        if not spec:
             raise KnowledgeManagementException(
                 f"No parser available for extension: {ext}",
                 None,
                 "ParserFactory"
             )
 
-        parser = parser_builder(cls._config)
+        with cls._lock:
+            parser = cls._parsers.get(ext)
+            if parser is None:
+                parser_cls = cls._import_parser_class(spec)
+                parser = parser_cls(**spec.kwargs(cls._get_config()))
+                cls._parsers[ext] = parser
+        return parser
+
+    @classmethod
+    def _get_cleaner(cls, section: str):
+        if section in cls._cleaners:
+            return cls._cleaners[section]
+        with cls._lock:
+            if section not in cls._cleaners:
+                preprocessing_cfg = cls._get_config().get(section, "preprocessing", {})
+                cleaner = None
+                if preprocessing_cfg:
+                    from preprocessing.cleaner import TextCleaner
+                    cleaner = TextCleaner(preprocessing_cfg)
+                cls._cleaners[section] = cleaner
+        return cls._cleaners[section]
+
+    @classmethod
+    def get_parser(cls, filename: str, content: bytes):
+        """Shared parser instance for the file's type."""
+        return cls._get_parser_for(cls._detect_extension(filename, content))
+
+    @classmethod
+    def _clean(cls, ext: str, filename: str, blocks: Iterator[dict]) -> Iterator[dict]:
+        cleaner = cls._get_cleaner(cls._registry[ext].config_section)
+        if cleaner is not None:
+            blocks = cleaner.iter_clean(blocks)
+            logger.info(f"Applying preprocessing for {filename}: {cleaner.config}")
+
+        yield from blocks
+
+    @classmethod
+    def iter_parse_and_clean(cls, filename: str, content: bytes) -> Iterator[dict]:
+        """Streaming form of parse_and_clean(): blocks are parsed and cleaned one at a time."""
+        ext = cls._detect_extension(filename, content)
+        parser = cls._get_parser_for(ext)
         logger.info(f"Selected parser {parser.__class__.__name__} for {filename}")
 
-        blocks = parser.parse(content)
+        yield from cls._clean(ext, filename, parser.iter_blocks(content))
 
-        preprocessing_cfg = cls._config.get(ext.strip("."), "preprocessing", {})
-        if preprocessing_cfg:
-            cleaner = TextCleaner(preprocessing_cfg)
-            blocks = cleaner.clean(blocks)
-            logger.info(f"Applied preprocessing for {filename}: {preprocessing_cfg}")
+    @classmethod
+    def iter_parse_and_clean_file(cls, path: str, filename: Optional[str] = None) -> Iterator[dict]:
+        """
+        iter_parse_and_clean() for a file on disk: parsers with a file reader (TXT maps the file)
+        never hold it in memory as a whole. MIME fallback only sniffs the head of the file.
+        """
+        filename = filename or os.path.basename(path)
+        with open(path, "rb") as f:
+            head = f.read(_MIME_SNIFF_BYTES)
+        ext = cls._detect_extension(filename, head)
+        parser = cls._get_parser_for(ext)
+        logger.info(f"Selected parser {parser.__class__.__name__} for {filename}")
 
-        return blocks
+        yield from cls._clean(ext, filename, parser.iter_file_blocks(path))
+
+    @classmethod
+    def parse_and_clean(cls, filename: str, content: bytes) -> list[dict]:
+        return list(cls.iter_parse_and_clean(filename, content))
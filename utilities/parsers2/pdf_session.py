@@ -0,0 +1,71 @@
+import io
+import fitz  # PyMuPDF
+import pdfplumber
+
+
+class PDFDocumentSession:
+    """
+    Open-once view of a PDF shared by every extraction step:
+    - PyMuPDF and pdfplumber each parse the document at most once, from memory
+    - Page objects are reused across text, table and OCR steps
+    - Single-page PDFs for OCR are rendered to bytes without temp files
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self._fitz_doc = None
+        self._plumber_pdf = None
+
+    @property
+    def fitz_doc(self):
+        if self._fitz_doc is None:
+            self._fitz_doc = fitz.open(stream=self.content, filetype="pdf")
+        return self._fitz_doc
+
+    @property
+    def plumber_pdf(self):
+        if self._plumber_pdf is None:
+            self._plumber_pdf = pdfplumber.open(io.BytesIO(self.content))
+        return self._plumber_pdf
+
+    @property
+    def page_count(self) -> int:
+        return self.fitz_doc.page_count
+
+    def fitz_page(self, page_num: int):
+        return self.fitz_doc[page_num]
+
+    def plumber_page(self, page_num: int):
+        return self.plumber_pdf.pages[page_num]
+
+    def page_pdf_bytes(self, page_num: int) -> bytes:
+        """Return a standalone single-page PDF (in memory) for page-level OCR."""
+        writer = fitz.open()
+        try:
+            writer.insert_pdf(self.fitz_doc, from_page=page_num, to_page=page_num)
+            return writer.tobytes()
+        finally:
+            writer.close()
+
+    def release_page(self, page_num: int):
+        """Drop pdfplumber's cached layout objects for a finished page so memory stays flat."""
+        if self._plumber_pdf is None:
+            return
+        page = self._plumber_pdf.pages[page_num]
+        flush = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+        if flush:
+            flush()
+
+    def close(self):
+        if self._plumber_pdf is not None:
+            self._plumber_pdf.close()
+            self._plumber_pdf = None
+        if self._fitz_doc is not None:
+            self._fitz_doc.close()
+            self._fitz_doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
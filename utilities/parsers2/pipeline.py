@@ -1,5 +1,7 @@
 # pipeline.py
 import io
+import os
+from typing import Callable, Iterable, Iterator, List, Optional
 from parsers.parser_factory import ParserFactory
 from preprocessing.cleaner import TextCleaner
 from chunking.smart_chunker import SmartChunker
@@ -8,24 +10,61 @@ from indexing.vector_index import VectorIndex
 from indexing.sparse_index import SparseIndex
 from indexing.metadata_store import MetadataStore
 from utils.logger import logger
-from utils.checksum import calculate_checksum, calculate_text_checksum
+from utils.checksum import calculate_checksum, calculate_file_checksum, calculate_text_checksum
 from exceptions import KnowledgeManagementException
 
 class IngestionPipeline:
-    def __init__(self):
+    def __init__(self, batch_size: int = 64, embedder=None):
+        """
+        :param batch_size: Number of changed chunks embedded and indexed together.
+                           Peak memory is bounded by this, not by document size.
+        :param embedder: Anything with embed_batch(texts); pass a shared EmbeddingService
+                         to micro-batch across concurrent ingestions.
+        """
         self.cleaner = TextCleaner()  # default config usage; or pass config
         self.chunker = SmartChunker()
-        self.embedder = Embedder()
+        self.embedder = embedder or Embedder()
         self.vector_index = VectorIndex()
         self.sparse_index = SparseIndex()
         self.metadata_store = MetadataStore()
+        self.batch_size = batch_size
+
+    def _iter_chunks(self, blocks: Iterable[dict]) -> Iterator[dict]:
+        iter_chunks = getattr(self.chunker, "iter_chunks", None)
+        if iter_chunks:
+            yield from iter_chunks(blocks)
+            return
+        # Chunkers without a streaming API are fed one block at a time
+        for block in blocks:
+            yield from self.chunker.chunk([block])
+
+    def _index_batch(self, chunks: List[dict]):
+        embeddings = self.embedder.embed_batch([c["text"] for c in chunks])
+        # NOTE: embed_batch must preserve order aligned with the batch
+        self.vector_index.upsert(embeddings, chunks)
+        self.sparse_index.index_chunks(chunks)
 
     def ingest(self, filename: str, content: bytes, project: str = "KnowledgeBase"):
         """
         Ingest or update a document. Performs chunk-diffing and only re-embeds changed chunks.
+        Blocks and chunks are streamed; changed chunks are embedded and indexed in batches of batch_size.
+        """
+        self._ingest(filename, lambda: calculate_checksum(content),
+                     lambda: ParserFactory.iter_parse_and_clean(filename, content), project)
+
+    def ingest_file(self, path: str, filename: Optional[str] = None, project: str = "KnowledgeBase"):
         """
+        ingest() for a file on disk: the checksum is computed in blocks and parsers with a file
+        reader (TXT) stream it, so large files are never loaded into memory as a whole.
+        """
+        filename = filename or os.path.basename(path)
+        self._ingest(filename, lambda: calculate_file_checksum(path),
+                     lambda: ParserFactory.iter_parse_and_clean_file(path, filename), project)
+
+    def _ingest(self, filename: str, checksum: Callable[[], str],
+                parse: Callable[[], Iterator[dict]], project: str):
         try:
-            file_checksum = calculate_checksum(content)
+            file_checksum = checksum()
             doc_id = filename  # use a stable doc id strategy in prod (UUID, SharePoint id, etc.)
 
             existing_doc = self.metadata_store.get_document(doc_id)
@@ -33,54 +72,46 @@ class IngestionPipeline:
                 logger.info(f"[Pipeline] No changes for {doc_id} (checksum match) — skipping.")
                 return
 
-            # Parse + clean
-            blocks = ParserFactory.parse_and_clean(filename, content)
+            old_chunks_map = self.metadata_store.get_chunks(doc_id) or {}
+
+            # Parse + clean + chunk lazily
+            blocks = parse()
 
-            # Chunk
-            chunks = self.chunker.chunk(blocks)
+            # Only ids and checksums are kept for the whole document
+            chunk_records = []
+            batch = []
+            changed_count = 0
 
-            # assign deterministic chunk ids and compute per-chunk checksum
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{doc_id}__chunk_{i}"
-                chunk["id"] = chunk_id
+            for position, chunk in enumerate(self._iter_chunks(blocks)):
+                # assign deterministic chunk ids and compute per-chunk checksum
+                chunk["id"] = f"{doc_id}__chunk_{position}"
                 chunk["checksum"] = calculate_text_checksum(chunk["text"])
+                chunk_records.append({"id": chunk["id"], "checksum": chunk["checksum"]})
+
+                # changed or new chunk
+                if old_chunks_map.get(chunk["id"]) != chunk["checksum"]:
+                    batch.append(chunk)
+
+                if len(batch) >= self.batch_size:
+                    self._index_batch(batch)
+                    changed_count += len(batch)
+                    batch = []
+
+            if batch:
+                self._index_batch(batch)
+                changed_count += len(batch)
+
+            # find deleted chunks (present previously but not in new set).
+            # Ids are positional, so removed ids never collide with the ones just upserted.
+            new_chunk_id_set = {c["id"] for c in chunk_records}
+            removed_chunk_ids = [old_id for old_id in old_chunks_map.keys() if old_id not in new_chunk_id_set]
 
-            # Determine which chunks changed
-            old_chunks_map = self.metadata_store.get_chunks(doc_id) or {}
-            changed_chunks = []
-            removed_chunk_ids = []
-            new_embeddings_texts = []
-            new_chunk_ids = []
-
-            # find changed or new chunks
-            for c in chunks:
-                old_checksum = old_chunks_map.get(c["id"])
-                if old_checksum != c["checksum"]:
-                    changed_chunks.append(c)
-                    new_embeddings_texts.append(c["text"])
-                    new_chunk_ids.append(c["id"])
-
-            # find deleted chunks (present previously but not in new set)
-            new_chunk_id_set = {c["id"] for c in chunks}
-            for old_id in old_chunks_map.keys():
-                if old_id not in new_chunk_id_set:
-                    removed_chunk_ids.append(old_id)
-
-            # Process deletes first (so we don't have duplicates)
             if removed_chunk_ids:
                 logger.info(f"[Pipeline] Deleting {len(removed_chunk_ids)} removed chunks for {doc_id}")
                 self.vector_index.delete_points(removed_chunk_ids)
                 self.sparse_index.delete_chunks(removed_chunk_ids)
                 self.metadata_store.remove_chunks(doc_id, removed_chunk_ids)
 
-            # Embed & upsert changed chunks
-            if changed_chunks:
-                embeddings = self.embedder.embed_batch(new_embeddings_texts)
-                # NOTE: embed_batch must preserve order aligned with new_embeddings_texts
-                # upsert into vector index using chunk objects (use embedding alignment)
-                self.vector_index.upsert(embeddings, changed_chunks)
-                self.sparse_index.index_chunks(changed_chunks)
-
             # Update metadata (store new doc checksum & chunk map)
             self.metadata_store.upsert_document(
                 doc_id=doc_id,
@@ -88,10 +119,10 @@ class IngestionPipeline:
                 uri=filename,
                 checksum=file_checksum,
                 project=project,
-                chunks=chunks
+                chunks=chunk_records
             )
 
-            logger.info(f"[Pipeline] Ingested {doc_id}: {len(changed_chunks)} changed, {len(removed_chunk_ids)} removed.")
+            logger.info(f"[Pipeline] Ingested {doc_id}: {changed_count} changed, {len(removed_chunk_ids)} removed.")
 
         except Exception as e:
             logger.exception(f"[Pipeline] ingest failed for {filename}: {e}")
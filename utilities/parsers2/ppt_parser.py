@@ -4,12 +4,13 @@ import io
 from typing import List, Dict, Any
 
 from unstructured.partition.pptx import partition_pptx
-from unstructured.partition.image import partition_image
 from utils.logger import logger
 from exceptions import KnowledgeManagementException
+from .base import BaseParser
+from .ocr_executor import get_ocr_executor
 
 
-class HybridPPTXParser:
+class HybridPPTXParser(BaseParser):
     """
     Hybrid PPTX parser:
     - Extracts text from shapes in slides
@@ -59,45 +60,29 @@ class HybridPPTXParser:
     # OCR logic
     # --------------------------
     def _ocr_images_only(self, image_blobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Run OCR on each image blob individually using partition_image."""
+        """Run OCR on a batch of image blobs on the shared OCR executor (in-memory, cached)."""
         ocr_blocks: List[Dict[str, Any]] = []
         if not image_blobs:
             return ocr_blocks
 
-        for img in image_blobs:
-            img_idx = img.get("image_index")
-            blob = img.get("blob")
-            if not blob:
-                continue
-
-            try:
-                elements = partition_image(
-                    file_content=blob,
-                    strategy="hi_res",
-                    ocr_strategy="ocr_only"
-                )
-                for el in elements:
-                    cat = getattr(el, "category", "text").lower()
-                    text = str(el).strip()
-                    if not text:
-                        continue
-
-                    if cat in ("table", "tabular"):
-                        block_type = "table"
-                    else:
-                        block_type = "image_text"
-
-                    ocr_blocks.append({
-                        "type": block_type,
-                        "text": text,
-                        "metadata": {
-                            "source": "pptx-image-ocr",
-                            "image_index": img_idx,
-                        }
-                    })
-            except Exception as e:
-                logger.warning(f"OCR failed for PPTX image {img_idx}: {e}")
-                continue
+        for img, pairs in get_ocr_executor().ocr_images(image_blobs):
+            for cat, text in pairs:
+                if cat in ("table", "tabular"):
+                    block_type = "table"
+                else:
+                    block_type = "image_text"
+
+                metadata = {
+                    "source": "pptx-image-ocr",
+                    "image_index": img.get("image_index"),
+                }
+                if "slide" in img:
+                    metadata["slide"] = img["slide"]
+                ocr_blocks.append({
+                    "type": block_type,
+                    "text": text,
+                    "metadata": metadata,
+                })
 
         return ocr_blocks
 
@@ -137,10 +122,23 @@ class HybridPPTXParser:
             results: List[Dict[str, Any]] = []
 
             total_text_len = 0
+            slides = []
 
             for slide_idx, slide in enumerate(prs.slides, start=1):
+                image_blobs = self._extract_image_blobs(slide)
+                for img in image_blobs:
+                    img["slide"] = slide_idx
+                slides.append((slide_idx, self._extract_slide_text(slide), image_blobs))
+
+            # Image OCR: submit every image in the deck at once instead of blocking per slide
+            ocr_by_slide: Dict[int, List[Dict[str, Any]]] = {}
+            if self.enable_ocr:
+                deck_images = [img for _, _, image_blobs in slides for img in image_blobs]
+                for block in self._ocr_images_only(deck_images):
+                    ocr_by_slide.setdefault(block["metadata"]["slide"], []).append(block)
+
+            for slide_idx, slide_text, image_blobs in slides:
                 # Native text
-                slide_text = self._extract_slide_text(slide)
                 if slide_text:
                     results.append({
                         "type": "text",
@@ -149,11 +147,8 @@ class HybridPPTXParser:
                     })
                     total_text_len += len(slide_text)
 
-                # Image OCR
-                image_blobs = self._extract_image_blobs(slide)
-                if self.enable_ocr and image_blobs:
-                    ocr_blocks = self._ocr_images_only(image_blobs)
-                    results.extend(ocr_blocks)
+                if self.enable_ocr:
+                    results.extend(ocr_by_slide.get(slide_idx, []))
                 elif image_blobs:
                     # placeholders if OCR disabled
                     for img in image_blobs:
@@ -0,0 +1,157 @@
+# indexing/quantization.py
+from typing import Dict, Optional
+import numpy as np
+from utils.logger import logger
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Lloyd k-means (squared L2) returning (k, dim) centroids."""
+    k = min(k, x.shape[0])
+    centroids = x[rng.choice(x.shape[0], k, replace=False)].copy()
+    for _ in range(iters):
+        # |x|^2 is constant per row, so it does not change the argmin
+        assign = np.argmin((centroids * centroids).sum(axis=1)[None, :] - 2.0 * (x @ centroids.T), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        centroids[filled] = np.add.reduceat(x[order], starts, axis=0) / counts[filled][:, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = x[rng.choice(x.shape[0], len(empty), replace=False)]
+    return centroids
+
+
+class ScalarQuantizer:
+    """
+    8-bit scalar quantization with a per-dimension offset and scale (4x smaller than float32).
+    Inner products are computed asymmetrically: float query against integer codes,
+    x ~= offset + scale * code  =>  q.x ~= q.offset + (q * scale).code
+    """
+
+    kind = "int8"
+
+    def __init__(self):
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.offset is not None
+
+    def code_size(self, dim: int) -> int:
+        return dim
+
+    def train(self, vectors: np.ndarray):
+        x = np.asarray(vectors, dtype=np.float32)
+        # Clip to the 0.1/99.9 percentiles so outliers do not waste the code range
+        low = np.percentile(x, 0.1, axis=0).astype(np.float32)
+        high = np.percentile(x, 99.9, axis=0).astype(np.float32)
+        self.offset = low
+        self.scale = np.where(high > low, (high - low) / 255.0, 1.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.offset) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.offset + codes.astype(np.float32) * self.scale
+
+    def inner_products(self, queries: np.ndarray, codes: np.ndarray, block: int = 16384) -> np.ndarray:
+        """(n_queries, n_codes) approximate inner products."""
+        scaled = (queries * self.scale).T
+        bias = queries @ self.offset
+        out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for start in range(0, codes.shape[0], block):
+            out[:, start:start + block] = (codes[start:start + block].astype(np.float32) @ scaled).T
+        out += bias[:, None]
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    def load(self, state: Dict[str, np.ndarray]):
+        self.offset = np.asarray(state["offset"], dtype=np.float32)
+        self.scale = np.asarray(state["scale"], dtype=np.float32)
+
+
+class ProductQuantizer:
+    """
+    Product quantization: the vector is split into `m` sub-vectors, each replaced by the id of
+    its nearest of 256 trained centroids (one byte per sub-vector, 4 * dim / m times smaller).
+    Queries use asymmetric distance computation: a (m, 256) table of sub-vector inner products
+    is built once per query and codes are scored by table lookups.
+    """
+
+    kind = "pq"
+
+    def __init__(self, m: Optional[int] = None, kmeans_iters: int = 15, train_size: int = 16384, seed: int = 0):
+        self.m = m
+        self.ksub = 256
+        self.kmeans_iters = kmeans_iters
+        self.train_size = train_size
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None   # (m, ksub, dsub)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def _resolve_m(self, dim: int) -> int:
+        # Default: 4 dims per sub-vector (16x smaller than float32), shrunk until it divides dim
+        m = self.m or max(1, dim // 4)
+        while dim % m:
+            m -= 1
+        return m
+
+    def code_size(self, dim: int) -> int:
+        return self._resolve_m(dim)
+
+    def train(self, vectors: np.ndarray):
+        x = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        if x.shape[0] > self.train_size:
+            x = x[rng.choice(x.shape[0], self.train_size, replace=False)]
+        self.m = self._resolve_m(x.shape[1])
+        dsub = x.shape[1] // self.m
+        codebooks = np.zeros((self.m, self.ksub, dsub), dtype=np.float32)
+        for j in range(self.m):
+            centroids = _kmeans(x[:, j * dsub:(j + 1) * dsub], self.ksub, self.kmeans_iters, rng)
+            codebooks[j, :len(centroids)] = centroids
+        self.codebooks = codebooks
+        logger.info(f"[ProductQuantizer] trained {self.m}x{self.ksub} codebooks on {x.shape[0]} vectors")
+
+    def encode(self, vectors: np.ndarray, block: int = 16384) -> np.ndarray:
+        x = np.asarray(vectors, dtype=np.float32)
+        dsub = self.codebooks.shape[2]
+        codes = np.empty((x.shape[0], self.m), dtype=np.uint8)
+        c_norms = np.einsum("jkd,jkd->jk", self.codebooks, self.codebooks)
+        for start in range(0, x.shape[0], block):
+            chunk = x[start:start + block]
+            for j in range(self.m):
+                sub = chunk[:, j * dsub:(j + 1) * dsub]
+                codes[start:start + block, j] = np.argmin(c_norms[j][None, :] - 2.0 * (sub @ self.codebooks[j].T), axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = [self.codebooks[j][codes[:, j]] for j in range(self.m)]
+        return np.concatenate(parts, axis=1)
+
+    def inner_products(self, queries: np.ndarray, codes: np.ndarray, block: int = 16384) -> np.ndarray:
+        """(n_queries, n_codes) approximate inner products via per-query lookup tables."""
+        dsub = self.codebooks.shape[2]
+        out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        columns = np.arange(self.m)
+        for qi, query in enumerate(queries):
+            table = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, dsub))
+            for start in range(0, codes.shape[0], block):
+                out[qi, start:start + block] = table[columns, codes[start:start + block]].sum(axis=1)
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load(self, state: Dict[str, np.ndarray]):
+        self.codebooks = np.asarray(state["codebooks"], dtype=np.float32)
+        self.m = self.codebooks.shape[0]
+
@@ -1,24 +1,174 @@
 # indexing/sparse_index.py
+import heapq
+import math
+import re
+import threading
 from typing import List, Dict, Any
 from utils.logger import logger
 
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
 class SparseIndex:
-    def __init__(self, index_name: str = "docs"):
+    """
+    Local BM25 keyword index (dev and small tenants):
+    - Term dictionary -> postings {doc number: term frequency}, plus per-document lengths
+      and corpus statistics (document count, total length), all updated incrementally
+    - Each term keeps its max term frequency; idf * max_tf * (k1 + 1) / (max_tf + k1 * (1 - b))
+      bounds its BM25 contribution for any document
+    - search() uses MaxScore: once the top-k threshold exceeds the summed bounds of the weakest
+      query terms, their postings are no longer scanned and only serve to complete scores
+    - Writes and searches hold an RLock, so concurrent ingestion threads can share an instance
+    """
+
+    def __init__(self, index_name: str = "docs", k1: float = 1.5, b: float = 0.75):
         # Replace with OpenSearch/Elasticsearch client
         self.index_name = index_name
-        self._local_index = {}  # {chunk_id: doc}
+        self.k1 = k1
+        self.b = b
+        self._local_index: Dict[str, Dict[str, Any]] = {}  # {chunk_id: doc}
+
+        self._postings: Dict[str, Dict[int, int]] = {}     # term -> {doc number: tf}
+        self._max_tf: Dict[str, int] = {}                  # term -> max tf ever seen (never shrinks: stays an upper bound)
+        self._doc_num: Dict[str, int] = {}                 # chunk_id -> doc number
+        self._chunk_ids: Dict[int, str] = {}               # doc number -> chunk_id
+        self._doc_terms: Dict[int, Dict[str, int]] = {}    # doc number -> {term: tf}, for deletes
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._next_doc = 0
+        # Worker threads share one pipeline: index_chunks/delete_chunks/search read-modify-write these maps
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def _remove(self, cid: str) -> bool:
+        doc = self._doc_num.pop(cid, None)
+        if doc is None:
+            return False
+        for term in self._doc_terms.pop(doc):
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+                del self._max_tf[term]
+        self._total_len -= self._doc_len.pop(doc)
+        del self._chunk_ids[doc]
+        del self._local_index[cid]
+        return True
 
     def index_chunks(self, chunks: List[Dict[str, Any]]):
-        for c in chunks:
-            cid = c["id"]
-            doc = {"text": c["text"], "metadata": c.get("metadata", {})}
-            self._local_index[cid] = doc
-        logger.info(f"[SparseIndex] indexed {len(chunks)} chunks to {self.index_name}")
+        with self._lock:
+            for c in chunks:
+                cid = c["id"]
+                # Re-indexing a chunk replaces its previous postings
+                self._remove(cid)
+                doc = {"text": c["text"], "metadata": c.get("metadata", {})}
+                self._local_index[cid] = doc
+
+                num = self._next_doc
+                self._next_doc += 1
+                terms: Dict[str, int] = {}
+                tokens = tokenize(c["text"])
+                for token in tokens:
+                    terms[token] = terms.get(token, 0) + 1
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[num] = tf
+                    if tf > self._max_tf.get(term, 0):
+                        self._max_tf[term] = tf
+                self._doc_num[cid] = num
+                self._chunk_ids[num] = cid
+                self._doc_terms[num] = terms
+                self._doc_len[num] = len(tokens)
+                self._total_len += len(tokens)
+            logger.info(f"[SparseIndex] indexed {len(chunks)} chunks to {self.index_name}")
 
     def delete_chunks(self, chunk_ids: List[str]):
-        removed = 0
-        for cid in chunk_ids:
-            if cid in self._local_index:
-                del self._local_index[cid]
-                removed += 1
-        logger.info(f"[SparseIndex] deleted {removed}/{len(chunk_ids)} chunks from {self.index_name}")
+        with self._lock:
+            removed = sum(1 for cid in chunk_ids if self._remove(cid))
+            logger.info(f"[SparseIndex] deleted {removed}/{len(chunk_ids)} chunks from {self.index_name}")
+
+    # --------------------------
+    # Search
+    # --------------------------
+    def _idf(self, term: str) -> float:
+        df = len(self._postings[term])
+        n = len(self._doc_len)
+        return math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+
+    def search(self, query: str, k: int = 10, with_payload: bool = True) -> List[Dict[str, Any]]:
+        """BM25 top-k for a keyword query; returns [{id, score, payload}] best first."""
+        with self._lock:
+            terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._postings]
+            if not terms or k <= 0:
+                return []
+
+            k1, b = self.k1, self.b
+            avgdl = self._total_len / len(self._doc_len) or 1.0
+            idf = {t: self._idf(t) for t in terms}
+            bound = {t: idf[t] * self._max_tf[t] * (k1 + 1) / (self._max_tf[t] + k1 * (1 - b)) for t in terms}
+
+            # Ascending by bound; prefix[i] = summed bounds of terms[:i]
+            terms.sort(key=lambda t: bound[t])
+            prefix = [0.0]
+            for t in terms:
+                prefix.append(prefix[-1] + bound[t])
+            doc_len = self._doc_len
+            postings = [self._postings[t] for t in terms]
+
+            def term_score(i: int, tf: int, dl: int) -> float:
+                return idf[terms[i]] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+
+            heap: List[tuple] = []   # (score, doc number), min-heap of the current top-k
+            threshold = 0.0
+            pivot = 0                # terms[:pivot] are non-essential: together they cannot reach the threshold
+            seen = set()
+
+            # Strongest terms first so the threshold rises quickly
+            for i in range(len(terms) - 1, -1, -1):
+                if i < pivot:
+                    break
+                for doc, tf in postings[i].items():
+                    if i < pivot:
+                        break
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    dl = doc_len[doc]
+                    score = term_score(i, tf, dl)
+                    # Remaining terms, strongest first, abandoning once the doc cannot enter the top-k
+                    for j in range(len(terms) - 1, -1, -1):
+                        if j == i:
+                            continue
+                        if len(heap) == k and score + prefix[j + 1] - (bound[terms[i]] if i < j else 0.0) <= threshold:
+                            break
+                        other_tf = postings[j].get(doc)
+                        if other_tf:
+                            score += term_score(j, other_tf, dl)
+
+                    if len(heap) < k:
+                        heapq.heappush(heap, (score, doc))
+                    elif score > heap[0][0]:
+                        heapq.heapreplace(heap, (score, doc))
+                    else:
+                        continue
+                    if len(heap) == k:
+                        threshold = heap[0][0]
+                        while pivot < len(terms) and prefix[pivot + 1] <= threshold:
+                            pivot += 1
+
+            hits = []
+            for score, doc in sorted(heap, key=lambda item: (-item[0], item[1])):
+                cid = self._chunk_ids[doc]
+                hit = {"id": cid, "score": score}
+                if with_payload:
+                    hit["payload"] = self._local_index[cid]
+                hits.append(hit)
+            return hits
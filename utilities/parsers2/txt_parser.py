@@ -1,62 +1,109 @@
 # ingestion/parsers/txt_parser.py
 from exceptions import KnowledgeManagementException
-from typing import List, Dict
+import codecs
+import mmap
+import os
+from collections import deque
+from typing import List, Dict, Iterator, Tuple, Union
+from .base import BaseParser
 
-class HybridTXTParser:
+_READ_BLOCK = 1 << 20
+
+
+class HybridTXTParser(BaseParser):
     """
     Optimized TXT parser:
-    - Splits text by lines or paragraphs intelligently
+    - Streams the input: bytes (or a memory-mapped file via iter_file_blocks) are decoded
+      incrementally in fixed-size blocks, never as one string
     - Filters empty lines
-    - Preserves line numbers for metadata
-    - Optional chunking for embeddings to reduce small-text noise
+    - Groups lines into chunks tracking the joined length as a running total
+    - Chunk metadata is a compact range: start_line/end_line (1-based file lines) and
+      char_start/char_end (offsets in the decoded text, with \\r\\n counted as one character)
     """
-    def __init__(self, chunk_size: int = 500, slide_window: int = 1):
+    def __init__(self, chunk_size: int = 500, slide_window: int = 1, read_block: int = _READ_BLOCK):
         """
         chunk_size: approximate number of characters per chunk
         slide_window: overlap between consecutive chunks
+        read_block: bytes decoded at a time
         """
         self.chunk_size = chunk_size
         self.slide_window = slide_window
+        self.read_block = read_block
 
-    def parse(self, content: bytes) -> List[Dict]:
-        try:
-            text = content.decode("utf-8", errors="ignore").replace("\r\n", "\n")
-            lines = [line.strip() for line in text.split("\n") if line.strip()]
-
-            # Step 1: Create basic line-level blocks
-            line_blocks = [
-                {"text": line, "metadata": {"line": idx, "source": "txt-native"}}
-                for idx, line in enumerate(lines, start=1)
-            ]
-
-            # Step 2: Chunk small lines into larger embedding-ready blocks
-            chunks = []
-            current_texts = []
-            current_meta = []
-
-            for block in line_blocks:
-                current_texts.append(block["text"])
-                current_meta.append(block["metadata"])
-
-                combined_text = " ".join(current_texts)
-                if len(combined_text) >= self.chunk_size:
-                    chunks.append({
-                        "text": combined_text,
-                        "metadata": {"lines": current_meta}
-                    })
-                    # Slide window
-                    current_texts = current_texts[self.slide_window:]
-                    current_meta = current_meta[self.slide_window:]
-
-            # Add any remaining lines
-            if current_texts:
-                chunks.append({
-                    "text": " ".join(current_texts),
-                    "metadata": {"lines": current_meta}
-                })
-
-            return chunks
+    def _iter_lines(self, data: Union[bytes, memoryview, mmap.mmap]) -> Iterator[Tuple[int, int, int, str]]:
+        """Yield (line number, char start, char end, stripped text) for every non-empty line."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        partial: List[str] = []  # pieces of the line still waiting for its "\n"
+        line_no = 0
+        line_start = 0
+
+        def split(line: str):
+            nonlocal line_no, line_start
+            line_no += 1
+            if line.endswith("\r"):
+                line = line[:-1]
+            stripped = line.strip()
+            start = line_start
+            line_start += len(line) + 1
+            if stripped:
+                char_start = start + len(line) - len(line.lstrip())
+                return line_no, char_start, char_start + len(stripped), stripped
+            return None
+
+        size = len(data)
+        for offset in range(0, size + 1, self.read_block):
+            final = offset + self.read_block > size
+            piece = decoder.decode(data[offset:offset + self.read_block], final=final)
+            if "\n" not in piece:
+                partial.append(piece)
+                continue
+            lines = piece.split("\n")
+            lines[0] = "".join(partial) + lines[0]
+            partial = [lines.pop()]
+            for line in lines:
+                entry = split(line)
+                if entry:
+                    yield entry
+
+        tail = "".join(partial)
+        if tail:
+            entry = split(tail)
+            if entry:
+                yield entry
+
+    def _iter_chunks(self, data: Union[bytes, memoryview, mmap.mmap]) -> Iterator[Dict]:
+        window = deque()
+        joined_len = -1
+
+        def emit():
+            return {
+                "text": " ".join(line[3] for line in window),
+                "metadata": {
+                    "source": "txt-native",
+                    "start_line": window[0][0],
+                    "end_line": window[-1][0],
+                    "char_start": window[0][1],
+                    "char_end": window[-1][2],
+                }
+            }
+
+        for line in self._iter_lines(data):
+            window.append(line)
+            joined_len += len(line[3]) + 1
+
+            if joined_len >= self.chunk_size:
+                yield emit()
+                # Slide window
+                for _ in range(min(self.slide_window, len(window))):
+                    joined_len -= len(window.popleft()[3]) + 1
 
+        # Add any remaining lines
+        if window:
+            yield emit()
+
+    def iter_blocks(self, content: bytes) -> Iterator[Dict]:
+        try:
+            yield from self._iter_chunks(memoryview(content))
         except Exception as e:
             raise KnowledgeManagementException(
                 f"Failed to parse TXT: {e}",
@@ -64,3 +111,22 @@ class HybridTXTParser:
                 "HybridTXTParser"
             )
 
+    def iter_file_blocks(self, path: str) -> Iterator[Dict]:
+        """Like iter_blocks, reading the file through mmap so only the pages in use are resident."""
+        try:
+            if os.path.getsize(path) == 0:
+                return
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from self._iter_chunks(mm)
+        except Exception as e:
+            raise KnowledgeManagementException(
+                f"Failed to parse TXT file {path}: {e}",
+                None,
+                "HybridTXTParser"
+            )
+
+    def parse(self, content: bytes) -> List[Dict]:
+        return list(self.iter_blocks(content))
+
+    def parse_file(self, path: str) -> List[Dict]:
+        return list(self.iter_file_blocks(path))
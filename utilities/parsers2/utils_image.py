@@ -1,19 +1,19 @@
 import io
-from typing import List, Dict
+from typing import List
+from .ocr_cache import get_ocr_cache, elements_to_pairs
 
-try:
-    import pytesseract
-    from PIL import Image
-except ImportError:
-    pytesseract = None
+# Cache namespace: one per OCR engine/settings combination
+UNSTRUCTURED_OCR_STRATEGY = "unstructured-image-hi_res-ocr_only"
 
 
-def ocr_image_bytes(img_bytes: bytes, source: str, meta: dict) -> List[Dict]:
-    """Run OCR on image bytes and return text blocks with metadata"""
-    if not pytesseract:
-        return []
-    image = Image.open(io.BytesIO(img_bytes))
-    text = pytesseract.image_to_string(image)
-    if text.strip():
-        return [{"text": text, "metadata": {**meta, "source": source, "type": "image-ocr"}}]
-    return []
+def _partition_image_pairs(img_bytes: bytes) -> List[List[str]]:
+    from unstructured.partition.image import partition_image
+
+    elements = partition_image(file=io.BytesIO(img_bytes), strategy="hi_res", ocr_strategy="ocr_only")
+    return elements_to_pairs(elements)
+
+
+def ocr_image_elements(img_bytes: bytes) -> List[List[str]]:
+    """OCR image bytes with Unstructured (hi_res) via the shared OCR cache; returns [category, text] pairs."""
+    return get_ocr_cache().get_or_compute(img_bytes, UNSTRUCTURED_OCR_STRATEGY, _partition_image_pairs)
+
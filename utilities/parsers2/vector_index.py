@@ -1,28 +1,730 @@
 # indexing/vector_index.py
-from typing import List, Dict, Any
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Sequence
+import numpy as np
 from utils.logger import logger
+from .ann_index import IVFFlatIndex
+from .quantization import ProductQuantizer, ScalarQuantizer
+
+SEGMENT_FORMAT_VERSION = 1
+
+
+class _SegmentColumn:
+    """
+    Row-indexed, read-through view of a variable-length column stored in a segment
+    (data file + int64 offsets file, both memory-mapped). Values are decoded on access;
+    writes and appended rows live in memory until the next snapshot.
+    """
+
+    def __init__(self, data_path: str, offsets_path: str, rows: int, decode: Callable[[bytes], Any]):
+        self._decode = decode
+        self._base = rows
+        self._offsets = np.memmap(offsets_path, dtype=np.int64, mode="r", shape=(rows + 1,)) if rows else None
+        size = os.path.getsize(data_path)
+        self._data = np.memmap(data_path, dtype=np.uint8, mode="r", shape=(size,)) if size else None
+        self._overlay: Dict[int, Any] = {}
+        self._extra: List[Any] = []
+
+    def __len__(self) -> int:
+        return self._base + len(self._extra)
+
+    def __getitem__(self, row: int):
+        if row >= self._base:
+            return self._extra[row - self._base]
+        if row in self._overlay:
+            return self._overlay[row]
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return self._decode(self._data[start:end].tobytes()) if end > start else None
+
+    def __setitem__(self, row: int, value):
+        if row >= self._base:
+            self._extra[row - self._base] = value
+        else:
+            self._overlay[row] = value
+
+    def extend(self, values):
+        self._extra.extend(values)
+
+
+class _VectorStore:
+    """
+    Float32 (capacity, dim) row matrix in two parts: a read-only memmap of a segment's committed
+    rows, never copied into RAM, followed by a growable tail for rows added since. The tail is an
+    in-RAM array, or with spill=True a memmap over an unlinked temp file that grows in place.
+    Rows are read with integer row arrays; only tail rows can be written.
+    """
+
+    def __init__(self, dim: int, capacity: int, base: Optional[np.ndarray] = None, spill: bool = False):
+        self.dim = dim
+        self._base = base
+        self._base_rows = 0 if base is None else base.shape[0]
+        self._file = tempfile.TemporaryFile(prefix="vectors-") if spill else None
+        self._tail = self._new_tail(max(1, capacity - self._base_rows))
+
+    def _new_tail(self, rows: int) -> np.ndarray:
+        if self._file is None:
+            return np.zeros((rows, self.dim), dtype=np.float32)
+        self._file.truncate(rows * self.dim * 4)
+        return np.memmap(self._file, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def grow(self, capacity: int):
+        rows = capacity - self._base_rows
+        if rows <= self._tail.shape[0]:
+            return
+        if self._file is not None:
+            # The file keeps its contents when extended: just map the larger size
+            self._tail.flush()
+            self._tail = self._new_tail(rows)
+        else:
+            tail = self._new_tail(rows)
+            tail[:self._tail.shape[0]] = self._tail
+            self._tail = tail
+
+    def parts(self, stop: int):
+        """(first row, block) for the rows [0, stop), one block per part."""
+        if self._base_rows:
+            yield 0, self._base[:min(stop, self._base_rows)]
+        if stop > self._base_rows:
+            yield self._base_rows, self._tail[:stop - self._base_rows]
+
+    def __getitem__(self, rows) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self._base_rows:
+            return self._tail[rows]
+        in_base = rows < self._base_rows
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        out[in_base] = self._base[rows[in_base]]
+        out[~in_base] = self._tail[rows[~in_base] - self._base_rows]
+        return out
+
+    def __setitem__(self, rows, values):
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and int(rows.min()) < self._base_rows:
+            raise ValueError("Segment rows are read-only")
+        self._tail[rows - self._base_rows] = values
+
+
+def _decode_id(raw: bytes) -> str:
+    return raw.decode("utf-8")
+
+
+def _decode_payload(raw: bytes) -> Dict[str, Any]:
+    return json.loads(raw)
+
 
 class VectorIndex:
-    def __init__(self, collection: str = "documents"):
-        # Replace with qdrant_client.QdrantClient or other vector DB client
-        # self.client = QdrantClient(...)
+    """
+    Local vector engine (dev and small tenants):
+    - Embeddings live in a float32 row store with id <-> row maps
+    - Deleted rows go on a free-list and are reused by later upserts; rows already in a segment are
+      never rewritten: deleting tombstones them and updating tombstones the old row and appends
+    - Exact top-k search via matrix multiply + argpartition
+    - index_type="ivf": approximate search over the `nprobe` nearest IVF lists once the
+      collection reaches ann_min_points (exact below that); recall_check() measures the trade-off
+    - quantization="int8" (4x) or "pq" (~16x): candidates are scored on compact codes with
+      asymmetric distances, then the best k * rescore_factor are re-scored on float vectors.
+      Only the codes are resident: float vectors are read from the segment memmap (rows from
+      open(path)) or from a temp-file memmap (rows added since)
+    - Metrics: "cosine" (vectors normalized on insert), "dot", "l2" (score = -squared distance)
+    - snapshot()/open() persist to an on-disk segment that is memory-mapped on open; once
+      compact_ratio of the rows are tombstoned, snapshot() rewrites the segment with live rows only:
+        segment.json              format version, metric, dim, row count (written last = commit point)
+        vectors.f32 / norms.f32   append-only float32 rows and squared norms
+        ids.bin + ids.idx         point ids and their int64 offsets
+        payloads.jsonl + .idx     JSON payloads and their int64 offsets
+        tombstones.bin            packed bitmap of deleted rows
+        ivf_centroids.npy/_assign.npy  trained IVF state (index_type="ivf" only)
+        quant_state.npz + quant_codes.npy/_norms.npy  trained quantizer and codes
+    """
+
+    METRICS = ("cosine", "dot", "l2")
+    INDEX_TYPES = ("flat", "ivf")
+    QUANTIZATIONS = ("int8", "pq")
+
+    def __init__(self, collection: str = "documents", dim: Optional[int] = None,
+                 metric: str = "cosine", initial_capacity: int = 1024, index_type: str = "flat",
+                 nlist: int = 1024, nprobe: int = 16, ann_min_points: int = 20000,
+                 quantization: Optional[str] = None, pq_m: Optional[int] = None,
+                 rescore_factor: int = 4, quantize_min_points: int = 10000, compact_ratio: float = 0.3):
+        # Replace with qdrant_client.QdrantClient or other vector DB client for production
+        if metric not in self.METRICS:
+            raise ValueError(f"Unsupported metric {metric}; expected one of {self.METRICS}")
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unsupported index_type {index_type}; expected one of {self.INDEX_TYPES}")
+        if quantization is not None and quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization {quantization}; expected one of {self.QUANTIZATIONS}")
         self.collection = collection
-        self._local_store = {}  # example in-memory store: {point_id: payload}
+        self.metric = metric
+        self.dim = dim
+        self._initial_capacity = initial_capacity
+
+        self._vectors: Optional[_VectorStore] = None  # (capacity, dim) float32
+        self._sq_norms: Optional[np.ndarray] = None  # (capacity,) for l2
+        self._live: Optional[np.ndarray] = None      # (capacity,) bool
+        self._ids: List[Optional[str]] = []          # row -> point id
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._row_of: Optional[Dict[str, int]] = {}  # point id -> row (None = build lazily)
+        self._free: List[int] = []
+        self._size = 0                               # rows ever used (high-water mark)
+
+        # Segment this index was opened from / last snapshotted to
+        self._segment_path: Optional[str] = None
+        self._segment_rows = 0
+        self.compact_ratio = compact_ratio
+        # Writers, searches and lazy IVF/quantizer training share the row arrays (_grow swaps them)
+        self._lock = threading.RLock()
+
+        self.ann: Optional[IVFFlatIndex] = None
+        if index_type == "ivf":
+            self.ann = IVFFlatIndex(nlist=nlist, nprobe=nprobe, metric=metric)
+        self.ann_min_points = ann_min_points
+
+        self.quantizer = None
+        if quantization == "int8":
+            self.quantizer = ScalarQuantizer()
+        elif quantization == "pq":
+            self.quantizer = ProductQuantizer(m=pq_m)
+        self.rescore_factor = rescore_factor
+        self.quantize_min_points = quantize_min_points
+        self._codes: Optional[np.ndarray] = None       # (capacity, code_size) uint8
+        self._code_norms: Optional[np.ndarray] = None  # (capacity,) squared norms of decoded codes
+
+        if dim is not None:
+            self._allocate(dim, initial_capacity)
+
+    def __len__(self) -> int:
+        if self._live is None:
+            return 0
+        return int(np.count_nonzero(self._live[:self._size]))
+
+    def _id_map(self) -> Dict[str, int]:
+        # Opened segments skip building the id map until the first write needs it
+        if self._row_of is None:
+            live_rows = np.flatnonzero(self._live[:self._size]).tolist()
+            self._row_of = {self._ids[row]: row for row in live_rows}
+        return self._row_of
+
+    # --------------------------
+    # Storage
+    # --------------------------
+    def _allocate(self, dim: int, capacity: int):
+        self.dim = dim
+        self._vectors = _VectorStore(dim, capacity, spill=self.quantizer is not None)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed: int):
+        capacity = self._live.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._vectors.grow(new_capacity)
+        sq_norms = np.zeros(new_capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._sq_norms, self._live = sq_norms, live
+        if self._codes is not None:
+            codes = np.zeros((new_capacity, self._codes.shape[1]), dtype=np.uint8)
+            codes[:self._size] = self._codes[:self._size]
+            code_norms = np.zeros(new_capacity, dtype=np.float32)
+            code_norms[:self._size] = self._code_norms[:self._size]
+            self._codes, self._code_norms = codes, code_norms
+
+    def _prepare(self, vectors) -> np.ndarray:
+        arr = np.asarray(vectors, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = arr[None, :]
+        if self.metric == "cosine":
+            norms = np.linalg.norm(arr, axis=1, keepdims=True)
+            arr = arr / np.where(norms == 0, 1.0, norms)
+        return arr
+
+    def _assign_rows(self, point_ids: Sequence[str]) -> np.ndarray:
+        rows = np.empty(len(point_ids), dtype=np.int64)
+        fresh = 0
+        row_of = self._id_map()
+        for i, pid in enumerate(point_ids):
+            row = row_of.get(pid)
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    row = self._size + fresh
+                    fresh += 1
+            rows[i] = row
+        self._grow(self._size + fresh)
+        self._size += fresh
+        if len(self._ids) < self._size:
+            pad = self._size - len(self._ids)
+            self._ids.extend([None] * pad)
+            self._payloads.extend([None] * pad)
+        return rows
 
+    def _write(self, point_ids: Sequence[str], vectors, payloads: Sequence[Dict[str, Any]]):
+        with self._lock:
+            if not point_ids:
+                return
+            arr = np.asarray(vectors, dtype=np.float32)
+            if self._vectors is None:
+                self._allocate(arr.shape[-1], max(self._initial_capacity, len(point_ids)))
+            arr = self._prepare(arr)
+            if arr.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dim {self.dim}, got {arr.shape[1]}")
+
+            # Later duplicates of the same id win, as with repeated single upserts
+            last = {pid: i for i, pid in enumerate(point_ids)}
+            order = sorted(last.values())
+            ids = [point_ids[i] for i in order]
+            arr = arr[order]
+
+            row_of = self._id_map()
+            if self._segment_rows:
+                # Segment rows are immutable: an updated point is tombstoned and appended
+                stale = [row_of.pop(pid) for pid in ids if row_of.get(pid, self._segment_rows) < self._segment_rows]
+                if stale:
+                    self._live[stale] = False
+                    if self.ann is not None and self.ann.is_trained:
+                        self.ann.remove(np.asarray(stale, dtype=np.int64))
+
+            rows = self._assign_rows(ids)
+            self._vectors[rows] = arr
+            self._sq_norms[rows] = np.einsum("ij,ij->i", arr, arr)
+            self._live[rows] = True
+            for row, pid, i in zip(rows.tolist(), ids, order):
+                self._ids[row] = pid
+                self._payloads[row] = payloads[i]
+                row_of[pid] = row
+            if self.ann is not None and self.ann.is_trained:
+                self.ann.add(rows, arr)
+            if self._codes is not None:
+                self._encode_rows(rows, arr)
+
+    # --------------------------
+    # Writes
+    # --------------------------
     def upsert(self, embeddings: List[List[float]], chunks: List[Dict[str, Any]]):
         # embeddings and chunks are aligned lists
-        for emb, chunk in zip(embeddings, chunks):
-            pid = chunk["id"]
-            payload = {"text": chunk["text"], "metadata": chunk.get("metadata", {})}
-            # TODO: call vector DB upsert
-            self._local_store[pid] = {"vector": emb, "payload": payload}
+        ids = [chunk["id"] for chunk in chunks]
+        payloads = [{"text": chunk["text"], "metadata": chunk.get("metadata", {})} for chunk in chunks]
+        self._write(ids, embeddings, payloads)
         logger.info(f"[VectorIndex] upserted {len(chunks)} vectors to {self.collection}")
 
+    def upsert_points(self, points: List[Dict[str, Any]]):
+        # points: list of {id, vector, payload}
+        self._write([p["id"] for p in points], [p["vector"] for p in points],
+                    [p.get("payload", {}) for p in points])
+        logger.info(f"[VectorIndex] upserted {len(points)} points to {self.collection}")
+
     def delete_points(self, point_ids: List[str]):
-        # TODO: call vector DB delete API (by point ids)
-        removed = 0
-        for pid in point_ids:
-            if pid in self._local_store:
-                del self._local_store[pid]
-                removed += 1
-        logger.info(f"[VectorIndex] deleted {removed}/{len(point_ids)} points from {self.collection}")
+        with self._lock:
+            removed = []
+            row_of = self._id_map()
+            for pid in point_ids:
+                row = row_of.pop(pid, None)
+                if row is None:
+                    continue
+                self._live[row] = False
+                self._ids[row] = None
+                self._payloads[row] = None
+                if row >= self._segment_rows:
+                    self._free.append(row)
+                removed.append(row)
+            if self.ann is not None and self.ann.is_trained:
+                self.ann.remove(np.asarray(removed, dtype=np.int64))
+            removed = len(removed)
+            logger.info(f"[VectorIndex] deleted {removed}/{len(point_ids)} points from {self.collection}")
+
+    # --------------------------
+    # Search
+    # --------------------------
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((queries.shape[0], self._size), dtype=np.float32)
+        for first, block in self._vectors.parts(self._size):
+            scores[:, first:first + block.shape[0]] = queries @ block.T
+        if self.metric == "l2":
+            q_norms = np.einsum("ij,ij->i", queries, queries)
+            scores = 2.0 * scores - self._sq_norms[:self._size][None, :] - q_norms[:, None]
+        scores[:, ~self._live[:self._size]] = -np.inf
+        return scores
+
+    @staticmethod
+    def _best_positions(scores: np.ndarray, k: int) -> np.ndarray:
+        n = scores.shape[0]
+        k = min(k, n)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def _top_k(self, scores: np.ndarray, k: int, with_payload: bool,
+               rows: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        # `rows` maps score positions back to matrix rows when only candidates were scored
+        hits = []
+        for pos in self._best_positions(scores, k).tolist():
+            score = float(scores[pos])
+            if score == -np.inf:
+                break
+            row = pos if rows is None else int(rows[pos])
+            hit = {"id": self._ids[row], "score": score}
+            if with_payload:
+                hit["payload"] = self._payloads[row]
+            hits.append(hit)
+        return hits
+
+    def _ensure_ann(self) -> bool:
+        """Train the IVF index on first use once the collection is large enough; True if usable."""
+        if self.ann is None:
+            return False
+        if not self.ann.is_trained:
+            if len(self) < self.ann_min_points:
+                return False
+            live_rows = np.flatnonzero(self._live[:self._size])
+            rng = np.random.default_rng(self.ann.seed)
+            max_train = self.ann.nlist * self.ann.points_per_centroid
+            sample = live_rows if len(live_rows) <= max_train else np.sort(rng.choice(live_rows, max_train, replace=False))
+            self.ann.train(self._vectors[sample])
+            for start in range(0, len(live_rows), 65536):
+                block = live_rows[start:start + 65536]
+                self.ann.add(block, self._vectors[block])
+        return True
+
+    def _encode_rows(self, rows: np.ndarray, vectors: np.ndarray):
+        codes = self.quantizer.encode(vectors)
+        decoded = self.quantizer.decode(codes)
+        self._codes[rows] = codes
+        self._code_norms[rows] = np.einsum("ij,ij->i", decoded, decoded)
+
+    def _ensure_quantizer(self) -> bool:
+        """Train the quantizer and encode every row on first use once the collection is large enough."""
+        if self.quantizer is None:
+            return False
+        if self._codes is None:
+            if len(self) < self.quantize_min_points:
+                return False
+            live_rows = np.flatnonzero(self._live[:self._size])
+            if not self.quantizer.is_trained:
+                rng = np.random.default_rng(0)
+                sample = live_rows if len(live_rows) <= 65536 else np.sort(rng.choice(live_rows, 65536, replace=False))
+                self.quantizer.train(self._vectors[sample])
+            capacity = self._live.shape[0]
+            self._codes = np.zeros((capacity, self.quantizer.code_size(self.dim)), dtype=np.uint8)
+            self._code_norms = np.zeros(capacity, dtype=np.float32)
+            for start in range(0, len(live_rows), 65536):
+                block = live_rows[start:start + 65536]
+                self._encode_rows(block, self._vectors[block])
+            logger.info(f"[VectorIndex] quantized {len(live_rows)} vectors of {self.collection} "
+                        f"({self._codes.shape[1]} bytes/vector vs {4 * self.dim})")
+        return True
+
+    def _row_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Exact scores of one query against the given rows."""
+        scores = self._vectors[rows] @ query
+        if self.metric == "l2":
+            scores = 2.0 * scores - self._sq_norms[rows] - float(query @ query)
+        return scores
+
+    def _approx_scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Asymmetric scores of one query against the codes of `rows` (all rows if None)."""
+        codes = self._codes[:self._size] if rows is None else self._codes[rows]
+        scores = self.quantizer.inner_products(query[None, :], codes)[0]
+        if self.metric == "l2":
+            norms = self._code_norms[:self._size] if rows is None else self._code_norms[rows]
+            scores = 2.0 * scores - norms - float(query @ query)
+        if rows is None:
+            scores[~self._live[:self._size]] = -np.inf
+        return scores
+
+    def _search_one(self, query: np.ndarray, k: int, with_payload: bool,
+                    rows: Optional[np.ndarray], quantized: bool) -> List[Dict[str, Any]]:
+        # rows: live candidate rows from the IVF index, or None for the whole collection
+        if not quantized:
+            return self._top_k(self._row_scores(query, rows), k, with_payload, rows=rows)
+        scores = self._approx_scores(query, rows)
+        if not self.rescore_factor:
+            return self._top_k(scores, k, with_payload, rows=rows)
+        shortlist = self._best_positions(scores, k * self.rescore_factor)
+        shortlist = shortlist[scores[shortlist] > -np.inf]
+        shortlist_rows = shortlist if rows is None else rows[shortlist]
+        return self._top_k(self._row_scores(query, shortlist_rows), k, with_payload, rows=shortlist_rows)
+
+    def search(self, query: List[float], k: int = 10, with_payload: bool = True,
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Dict[str, Any]]:
+        """Top-k for one query; returns [{id, score, payload}] best first."""
+        return self.search_batch([query], k=k, with_payload=with_payload, nprobe=nprobe, exact=exact)[0]
+
+    def search_batch(self, queries: List[List[float]], k: int = 10, with_payload: bool = True,
+                     query_block: int = 256, nprobe: Optional[int] = None,
+                     exact: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k for many queries. Exact search scores queries in blocks to bound the score matrix;
+        with an IVF index (and exact=False) only the rows of the probed lists are scored, and
+        with quantization they are scored on codes and re-scored on float vectors.
+        """
+        with self._lock:
+            if not len(queries):
+                return []
+            if not len(self):
+                return [[] for _ in range(len(queries))]
+            prepared = self._prepare(queries)
+            use_ann = not exact and self._ensure_ann()
+            quantized = not exact and self._ensure_quantizer()
+            if use_ann or quantized:
+                candidates = self.ann.candidates(prepared, nprobe) if use_ann else [None] * len(prepared)
+                return [
+                    self._search_one(query, k, with_payload, None if rows is None else rows[self._live[rows]], quantized)
+                    for query, rows in zip(prepared, candidates)
+                ]
+            results = []
+            for start in range(0, prepared.shape[0], query_block):
+                scores = self._scores(prepared[start:start + query_block])
+                results.extend(self._top_k(row_scores, k, with_payload) for row_scores in scores)
+            return results
+
+    def recall_check(self, queries: Optional[List[List[float]]] = None, k: int = 10,
+                     nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32, 64),
+                     sample: int = 100, rescore_factors: Optional[Sequence[int]] = None) -> List[Dict[str, float]]:
+        """
+        Compare approximate (IVF and/or quantized) search against exact search to pick nprobe and
+        rescore_factor for this collection. Without queries, `sample` stored vectors are used.
+        Returns one row per setting: {nprobe, rescore_factor, recall (recall@k vs exact), mean_ms, p95_ms};
+        the first row is exact search.
+        """
+        with self._lock:
+            ann_ready = self._ensure_ann()
+            quant_ready = self._ensure_quantizer()
+            if not (ann_ready or quant_ready):
+                raise ValueError("recall_check needs an IVF index or quantization and enough vectors to train it")
+            if queries is None:
+                live_rows = np.flatnonzero(self._live[:self._size])
+                rng = np.random.default_rng(0)
+                picked = rng.choice(live_rows, min(sample, len(live_rows)), replace=False)
+                queries = self._vectors[picked]
+
+            def timed(**kwargs):
+                hits, latencies = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    hits.append({h["id"] for h in self.search(query, k=k, with_payload=False, **kwargs)})
+                    latencies.append((time.perf_counter() - start) * 1000.0)
+                return hits, latencies
+
+            truth, latencies = timed(exact=True)
+            report = [{"nprobe": 0, "rescore_factor": 0, "recall": 1.0, "mean_ms": float(np.mean(latencies)),
+                       "p95_ms": float(np.percentile(latencies, 95))}]
+            configured_rescore = self.rescore_factor
+            try:
+                for rescore_factor in (rescore_factors or [configured_rescore]) if quant_ready else [0]:
+                    self.rescore_factor = rescore_factor
+                    for nprobe in nprobe_values if ann_ready else [None]:
+                        found, latencies = timed(nprobe=nprobe)
+                        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth) if t])
+                        report.append({"nprobe": nprobe, "rescore_factor": rescore_factor, "recall": float(recall),
+                                       "mean_ms": float(np.mean(latencies)),
+                                       "p95_ms": float(np.percentile(latencies, 95))})
+                        logger.info(f"[VectorIndex] {self.collection} nprobe={nprobe} rescore={rescore_factor}: "
+                                    f"recall@{k}={recall:.3f}")
+            finally:
+                self.rescore_factor = configured_rescore
+            return report
+
+    # --------------------------
+    # Persistence
+    # --------------------------
+    @staticmethod
+    def _write_column(data_path: str, offsets_path: str, values, start: int):
+        """
+        Write encoded values plus their offsets after the first `start` committed rows (0 = rewrite).
+        Bytes past the committed rows, left by an interrupted snapshot, are truncated first.
+        """
+        base = 0
+        if start:
+            base = int(np.fromfile(offsets_path, dtype=np.int64, count=start + 1)[start])
+            with open(offsets_path, "r+b") as f:
+                f.truncate((start + 1) * 8)
+            with open(data_path, "r+b") as f:
+                f.truncate(base)
+        offsets = np.empty(len(values) + (0 if start else 1), dtype=np.int64)
+        pos = 0
+        if not start:
+            offsets[0] = 0
+            pos = 1
+        end = base
+        with open(data_path, "ab" if start else "wb") as f:
+            for raw in values:
+                f.write(raw)
+                end += len(raw)
+                offsets[pos] = end
+                pos += 1
+        with open(offsets_path, "ab" if start else "wb") as f:
+            f.write(offsets.tobytes())
+
+    def _write_segment_files(self, path: str, start: int, keep: Optional[np.ndarray] = None):
+        """
+        Write rows [start, size) after the `start` rows already committed at `path` (0 = write every
+        file from scratch). With `keep` (compaction, start=0) only those rows are written, renumbered.
+        """
+        source = np.arange(start, self._size) if keep is None else keep
+        rows = start + len(source)
+        for name, column, width in (("vectors.f32", self._vectors, self.dim * 4), ("norms.f32", self._sq_norms, 4)):
+            with open(os.path.join(path, name), "r+b" if start else "wb") as f:
+                # Drop anything an interrupted snapshot appended past the committed rows
+                f.truncate(start * width)
+                f.seek(0, os.SEEK_END)
+                for block in range(0, len(source), 65536):
+                    f.write(np.ascontiguousarray(column[source[block:block + 65536]], dtype=np.float32).tobytes())
+
+        ids, payloads = [], []
+        for row in source.tolist():
+            live = bool(self._live[row])
+            ids.append(self._ids[row].encode("utf-8") if live else b"")
+            payloads.append(json.dumps(self._payloads[row]).encode("utf-8") if live else b"")
+        self._write_column(os.path.join(path, "ids.bin"), os.path.join(path, "ids.idx"), ids, start)
+        self._write_column(os.path.join(path, "payloads.jsonl"), os.path.join(path, "payloads.idx"), payloads, start)
+
+        if self.ann is not None and self.ann.is_trained:
+            assign = self.ann.assignments(self._size)
+            assign = assign[:rows] if keep is None else assign[keep]
+            for name, data in (("ivf_centroids.npy", self.ann.centroids), ("ivf_assign.npy", assign)):
+                tmp = os.path.join(path, name + ".tmp")
+                with open(tmp, "wb") as f:
+                    np.save(f, data)
+                os.replace(tmp, os.path.join(path, name))
+
+        if self._codes is not None:
+            state = dict(self.quantizer.state(), kind=np.array(self.quantizer.kind))
+            codes, code_norms = (self._codes[:rows], self._code_norms[:rows]) if keep is None else \
+                (self._codes[keep], self._code_norms[keep])
+            for name, data in (("quant_state.npz", None), ("quant_codes.npy", codes), ("quant_norms.npy", code_norms)):
+                tmp = os.path.join(path, name + ".tmp")
+                with open(tmp, "wb") as f:
+                    if data is None:
+                        np.savez(f, **state)
+                    else:
+                        np.save(f, data)
+                os.replace(tmp, os.path.join(path, name))
+
+        live = self._live[:rows] if keep is None else np.ones(rows, dtype=bool)
+        tombstones = np.packbits(~live) if rows else np.empty(0, dtype=np.uint8)
+        tmp = os.path.join(path, "tombstones.bin.tmp")
+        tombstones.tofile(tmp)
+        os.replace(tmp, os.path.join(path, "tombstones.bin"))
+
+        meta = {
+            "version": SEGMENT_FORMAT_VERSION,
+            "collection": self.collection,
+            "metric": self.metric,
+            "dim": self.dim,
+            "rows": rows,
+        }
+        tmp = os.path.join(path, "segment.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "segment.json"))
+
+    def snapshot(self, path: str, compact: Optional[bool] = None):
+        """
+        Persist the index as a segment at `path`.
+        Re-snapshotting the segment this index came from only appends new rows and rewrites
+        the tombstone bitmap. Once compact_ratio of the rows are tombstoned (or with compact=True)
+        the segment is rewritten with live rows only and the index reloads from it (rows renumbered).
+        """
+        with self._lock:
+            if self._vectors is None:
+                raise ValueError("Cannot snapshot an empty VectorIndex with unknown dimension")
+            path = os.path.abspath(path)
+            live = len(self)
+            if compact is None:
+                compact = self._size > 0 and (self._size - live) >= self.compact_ratio * self._size
+
+            if not compact and path == self._segment_path and self._segment_rows <= self._size:
+                self._write_segment_files(path, self._segment_rows)
+            else:
+                # Full rewrite into a sibling directory, then swap it in
+                tmp_path = path + ".tmp"
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                os.makedirs(tmp_path)
+                keep = np.flatnonzero(self._live[:self._size]) if compact else None
+                self._write_segment_files(tmp_path, 0, keep)
+                old_path = path + ".old"
+                shutil.rmtree(old_path, ignore_errors=True)
+                if os.path.exists(path):
+                    os.replace(path, old_path)
+                os.replace(tmp_path, path)
+                shutil.rmtree(old_path, ignore_errors=True)
+
+            dead = self._size - live
+            if compact:
+                self._load_segment(path)
+            else:
+                self._segment_path = path
+                self._segment_rows = self._size
+                # Rows on disk are not reused, so later upserts stay appends
+                self._free = []
+            logger.info(f"[VectorIndex] snapshot of {self.collection} ({live} live / {self._size} rows) to {path}"
+                        + (f", compacted away {dead} tombstoned rows" if compact else ""))
+
+    def _load_segment(self, path: str):
+        """Point this index at the segment at `path` (memory-mapped; only tombstones and codes are read)."""
+        with open(os.path.join(path, "segment.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SEGMENT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported segment format {meta.get('version')} at {path}")
+
+        dim, rows = meta["dim"], meta["rows"]
+        self.dim = dim
+        if rows:
+            base = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(rows, dim))
+            self._vectors = _VectorStore(dim, rows, base=base, spill=self.quantizer is not None)
+            self._sq_norms = np.memmap(os.path.join(path, "norms.f32"), dtype=np.float32,
+                                       mode="c", shape=(rows,))
+            packed = np.fromfile(os.path.join(path, "tombstones.bin"), dtype=np.uint8)
+            self._live = ~np.unpackbits(packed, count=rows).astype(bool)
+        else:
+            self._allocate(dim, self._initial_capacity)
+
+        self._ids = _SegmentColumn(os.path.join(path, "ids.bin"), os.path.join(path, "ids.idx"),
+                                   rows, _decode_id)
+        self._payloads = _SegmentColumn(os.path.join(path, "payloads.jsonl"), os.path.join(path, "payloads.idx"),
+                                        rows, _decode_payload)
+        self._row_of = None
+        self._free = []
+        self._size = rows
+        self._segment_path = path
+        self._segment_rows = rows
+        centroids_path = os.path.join(path, "ivf_centroids.npy")
+        if self.ann is not None and os.path.exists(centroids_path):
+            self.ann.load(np.load(centroids_path), np.load(os.path.join(path, "ivf_assign.npy"), mmap_mode="r"))
+        self._codes = self._code_norms = None
+        quant_path = os.path.join(path, "quant_state.npz")
+        if self.quantizer is not None and os.path.exists(quant_path):
+            with np.load(quant_path) as state:
+                if str(state["kind"]) == self.quantizer.kind:
+                    self.quantizer.load(state)
+                    self._codes = np.load(os.path.join(path, "quant_codes.npy"))
+                    self._code_norms = np.load(os.path.join(path, "quant_norms.npy"))
+
+    @classmethod
+    def open(cls, path: str, **options) -> "VectorIndex":
+        """
+        Open a segment without reading it into RAM: vectors, norms, ids and payloads are
+        memory-mapped (vectors read-only) and only the tombstone bitmap is loaded.
+        The id -> row map is built on the first write; deleted rows stay tombstoned
+        (not reused) so new points are appended. `options` go to the constructor
+        (e.g. index_type="ivf"); a persisted IVF state is reused when present.
+        """
+        path = os.path.abspath(path)
+        with open(os.path.join(path, "segment.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(collection=meta["collection"], metric=meta["metric"], **options)
+        index._load_segment(path)
+        logger.info(f"[VectorIndex] opened segment {path}: {len(index)} live / {index._size} rows")
+        return index